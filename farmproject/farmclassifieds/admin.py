@@ -1,8 +1,9 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.utils import timezone
 
-from .models import User, AdPost, AdImage
+from . import facets, moderation
+from .models import User, AdPost, AdImage, ImageBlob, ImageJob, PostcodeCentroid
 from django.contrib.auth.admin import UserAdmin
 from django.urls import reverse
 from django.utils.html import format_html
@@ -47,13 +48,15 @@ class UserAdmin(BaseUserAdmin):
 
         # ✅ USER JUST GOT VERIFIED → AUTO-APPROVE THEIR PENDING POSTS
         if not was_verified and obj.is_verified_seller:
-            AdPost.objects.filter(
+            pending = AdPost.objects.filter(
                 created_by=obj,
                 admin_verified=False
-            ).update(
-                admin_verified=True,
-                public_flagged=False
             )
+            with facets.tracking(pending.values_list("pk", flat=True)):
+                pending.update(
+                    admin_verified=True,
+                    public_flagged=False
+                )
 
 
 # =========================
@@ -62,7 +65,7 @@ class UserAdmin(BaseUserAdmin):
 class AdImageInline(admin.TabularInline):
     model = AdImage
     extra = 0
-    readonly_fields = ("image", "webp_image")
+    readonly_fields = ("image", "webp_image", "processed")
 
 
 # =========================
@@ -119,6 +122,29 @@ class AdPostAdmin(admin.ModelAdmin):
 
     inlines = [AdImageInline]
 
+    actions = ["approve_selected", "reject_selected", "extend_one_month", "extend_two_months"]
+
+    # Bulk moderation: one transaction, set-based (moderation.py)
+    @admin.action(description="Approve selected ads")
+    def approve_selected(self, request, queryset):
+        approved = moderation.approve(queryset)
+        self.message_user(request, f"Approved {approved} ad(s).")
+
+    @admin.action(description="Reject (delete) selected ads and their images")
+    def reject_selected(self, request, queryset):
+        ads, images = moderation.reject(queryset)
+        self.message_user(request, f"Deleted {ads} ad(s) and {images} image(s).", messages.WARNING)
+
+    @admin.action(description="Extend selected ads by 1 month")
+    def extend_one_month(self, request, queryset):
+        extended = moderation.extend(queryset, 1)
+        self.message_user(request, f"Extended {extended} ad(s) by 1 month.")
+
+    @admin.action(description="Extend selected ads by 2 months")
+    def extend_two_months(self, request, queryset):
+        extended = moderation.extend(queryset, 2)
+        self.message_user(request, f"Extended {extended} ad(s) by 2 months.")
+
     # Optional: highlight expired ads
     def get_queryset(self, request):
         qs = super().get_queryset(request)
@@ -134,7 +160,47 @@ class AdPostAdmin(admin.ModelAdmin):
 # =========================
 @admin.register(AdImage)
 class AdImageAdmin(admin.ModelAdmin):
-    list_display = ("id", "post", "image")
+    list_display = ("id", "post", "image", "processed")
+    list_filter = ("processed",)
     autocomplete_fields = ("post",)
 
 
+# =========================
+# IMAGE JOB QUEUE
+# =========================
+@admin.register(ImageJob)
+class ImageJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "image", "status", "attempts", "worker", "created_at", "finished_at")
+    list_filter = ("status",)
+    readonly_fields = ("image", "worker", "locked_at", "created_at", "finished_at", "error")
+    actions = ["retry_jobs"]
+
+    @admin.action(description="Retry selected jobs")
+    def retry_jobs(self, request, queryset):
+        updated = queryset.exclude(status=ImageJob.DONE).update(
+            status=ImageJob.PENDING, attempts=0, worker=""
+        )
+        self.message_user(request, f"{updated} job(s) queued again.")
+
+
+
+
+# =========================
+# CONTENT-ADDRESSED IMAGE BLOBS
+# =========================
+@admin.register(ImageBlob)
+class ImageBlobAdmin(admin.ModelAdmin):
+    list_display = ("id", "digest", "refcount", "size", "processed", "created_at")
+    list_filter = ("processed",)
+    search_fields = ("digest",)
+    ordering = ("-refcount",)
+    readonly_fields = [f.name for f in ImageBlob._meta.fields]
+
+
+# =========================
+# POSTCODE CENTROIDS
+# =========================
+@admin.register(PostcodeCentroid)
+class PostcodeCentroidAdmin(admin.ModelAdmin):
+    list_display = ("postcode", "latitude", "longitude")
+    search_fields = ("postcode",)
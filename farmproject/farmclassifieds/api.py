@@ -0,0 +1,226 @@
+# farmclassifieds/api.py
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Prefetch, prefetch_related_objects
+from django.http import JsonResponse
+from django.urls import reverse
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import require_GET
+
+from . import viewcounts
+from .conditional import Validators
+from .models import AdImage, AdPost
+from .pagination import KeysetPaginator, SORT_KEYS
+from .search import keyword_search
+
+
+# ---------------------------------------------
+# READ-ONLY JSON API (v1)
+# ---------------------------------------------
+# GET /api/v1/posts/?district=&category=&postcode=&q=&sort=&cursor=&limit=&fields=
+# GET /api/v1/posts/<id>/?fields=
+#
+# Same filters and sort modes as the HTML feed, keyset cursors instead
+# of page numbers, and ?fields=id,title,price,thumb to trim each item.
+# Only the columns (and images) the requested fields need are loaded.
+# Responses are compact JSON, gzipped, with a public ETag so the app and
+# any shared cache can revalidate cheaply.
+
+API_PAGE_SIZE = getattr(settings, "API_PAGE_SIZE", 24)
+API_MAX_PAGE_SIZE = getattr(settings, "API_MAX_PAGE_SIZE", 100)
+API_CACHE_SECONDS = getattr(settings, "API_CACHE_SECONDS", 60)
+
+
+def _media_url(request, storage, name):
+    return request.build_absolute_uri(storage.url(name)) if name else None
+
+
+def _image(request, img):
+    storage = img.image.storage
+    return {
+        "w": img.width,
+        "h": img.height,
+        "jpg": _media_url(request, storage, img.image.name),
+        "webp": _media_url(request, storage, img.webp_image.name),
+        "renditions": [
+            {
+                "w": r["w"],
+                "h": r["h"],
+                "jpg": _media_url(request, storage, r.get("jpg")),
+                "webp": _media_url(request, storage, r.get("webp")),
+            }
+            for r in img.renditions or []
+        ],
+    }
+
+
+def _thumb(request, post):
+    images = post.images.all()
+    if not images:
+        return None
+    img = images[0]
+    renditions = img.renditions or []
+    name = renditions[0].get("jpg") if renditions else None
+    return _media_url(request, img.image.storage, name or img.image.name)
+
+
+# field -> (columns it reads, needs images, serializer)
+FIELDS = {
+    "id": ((), False, lambda request, post: post.pk),
+    "title": (("title",), False, lambda request, post: post.title),
+    "contents": (("contents",), False, lambda request, post: post.contents),
+    "category": (("category",), False, lambda request, post: post.category),
+    "district": (("district",), False, lambda request, post: post.district),
+    "postcode": (("postcode",), False, lambda request, post: post.postcode),
+    "price": (("price",), False, lambda request, post: post.price),
+    "created_at": (("created_at",), False, lambda request, post: post.created_at),
+    "expires_at": (("expires_at",), False, lambda request, post: post.expires_at),
+    # Stored count + views still buffered, as on the detail page
+    "view_count": (("view_count",), False, lambda request, post: post.view_count + viewcounts.pending(post.pk)),
+    "url": ((), False, lambda request, post: request.build_absolute_uri(
+        reverse("post_detail", args=[post.pk]))),
+    "thumb": ((), True, _thumb),
+    "images": ((), True, lambda request, post: [_image(request, img) for img in post.images.all()]),
+}
+
+LIST_FIELDS = ("id", "title", "price", "category", "district", "created_at", "thumb")
+DETAIL_FIELDS = tuple(FIELDS)
+
+
+class BadRequest(Exception):
+    pass
+
+
+def _json(data, status=200):
+    return JsonResponse(
+        data, status=status, encoder=DjangoJSONEncoder,
+        json_dumps_params={"separators": (",", ":"), "ensure_ascii": False},
+    )
+
+
+def _error(message, status=400):
+    return _json({"error": message}, status=status)
+
+
+def _fields(request, default):
+    raw = request.GET.get("fields")
+    if not raw:
+        return default
+    fields = tuple(dict.fromkeys(f.strip() for f in raw.split(",") if f.strip()))
+    unknown = [f for f in fields if f not in FIELDS]
+    if unknown:
+        raise BadRequest(f"Unknown field(s): {', '.join(unknown)}.")
+    return fields
+
+
+def _load(queryset, fields, *extra):
+    """only() the columns `fields` read, and prefetch images if any need them."""
+    columns = {"modified_at", *extra}
+    for f in fields:
+        columns.update(FIELDS[f][0])
+    return queryset.only(*columns), any(FIELDS[f][1] for f in fields)
+
+
+def _prefetch_images(posts):
+    prefetch_related_objects(posts, Prefetch(
+        "images",
+        queryset=AdImage.objects.only(
+            "post", "image", "webp_image", "width", "height", "renditions",
+        ).order_by("id"),
+    ))
+
+
+def _serialize(request, post, fields):
+    return {f: FIELDS[f][2](request, post) for f in fields}
+
+
+def _limit(request):
+    raw = request.GET.get("limit")
+    if not raw:
+        return API_PAGE_SIZE
+    if not raw.isdigit() or int(raw) < 1:
+        raise BadRequest("limit must be a positive integer.")
+    return min(int(raw), API_MAX_PAGE_SIZE)
+
+
+@gzip_page
+@require_GET
+def post_list(request):
+    try:
+        fields = _fields(request, LIST_FIELDS)
+        limit = _limit(request)
+    except BadRequest as e:
+        return _error(str(e))
+
+    sort = request.GET.get("sort", "new")
+    if sort not in SORT_KEYS:
+        return _error(f"sort must be one of: {', '.join(SORT_KEYS)}.")
+
+    posts = AdPost.objects.live()
+
+    district = request.GET.get("district")
+    category = request.GET.get("category")
+    postcode = request.GET.get("postcode")
+    q = request.GET.get("q", "").strip()
+
+    if district:
+        posts = posts.filter(district=district)
+    if category:
+        posts = posts.filter(category=category)
+    if postcode:
+        posts = posts.postcode_prefix(postcode)
+    if q:
+        posts = keyword_search(posts, q)
+
+    posts, with_images = _load(posts, fields, SORT_KEYS[sort][0])
+    page = KeysetPaginator(posts, limit, sort).get_page(request.GET.get("cursor"))
+
+    validators = Validators(
+        request,
+        [(post.pk, post.modified_at) for post in page],
+        page.has_next, page.has_previous, fields,
+        public=True, max_age=API_CACHE_SECONDS,
+    )
+    cached = validators.not_modified()
+    if cached:
+        return cached
+
+    if with_images:
+        _prefetch_images(page.object_list)
+
+    return validators.apply(_json({
+        "results": [_serialize(request, post, fields) for post in page],
+        "next": page.next_cursor,
+        "previous": page.previous_cursor,
+    }))
+
+
+@gzip_page
+@require_GET
+def post_detail(request, pk):
+    try:
+        fields = _fields(request, DETAIL_FIELDS)
+    except BadRequest as e:
+        return _error(str(e))
+
+    posts, with_images = _load(AdPost.objects.live().filter(pk=pk), fields)
+    post = posts.first()
+    if post is None:
+        return _error("Not found.", status=404)
+
+    images = []
+    if with_images:
+        _prefetch_images([post])
+        images = [(img.pk, img.image.name) for img in post.images.all()]
+
+    validators = Validators(
+        request, post.pk, post.modified_at, images, fields,
+        last_modified=post.modified_at,
+        public=True, max_age=API_CACHE_SECONDS,
+    )
+    cached = validators.not_modified()
+    if cached:
+        return cached
+
+    return validators.apply(_json(_serialize(request, post, fields)))
@@ -0,0 +1,235 @@
+# farmclassifieds/blobstore.py
+
+import hashlib
+import os
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Case, Count, F, IntegerField, Sum, Value, When
+from django.utils import timezone
+
+from . import cards
+from .models import AdImage, AdPost, ImageBlob
+
+
+# ---------------------------------------------
+# CONTENT-ADDRESSED IMAGE STORAGE
+# ---------------------------------------------
+# Every upload is named after the SHA-256 of its bytes, so a seller who
+# re-posts the same photo gets the same ImageBlob: nothing is stored or
+# encoded twice. AdImage rows point at a blob and carry a copy of its
+# variant names (templates keep reading AdImage only). ImageBlob.refcount
+# counts those rows; the files go when the last one is deleted.
+
+def file_digest(f):
+    h = hashlib.sha256()
+    f.seek(0)
+    for chunk in f.chunks():
+        h.update(chunk)
+    f.seek(0)
+    return h.hexdigest()
+
+
+def _shard(digest):
+    return digest[:2]
+
+
+def raw_name(digest, filename):
+    ext = os.path.splitext(filename)[1].lower() or ".jpg"
+    return f"ad_images/orig/{_shard(digest)}/{digest}{ext}"
+
+
+def jpg_name(digest):
+    return f"ad_images/{_shard(digest)}/{digest}.jpg"
+
+
+def webp_name(digest):
+    return f"ad_images/webp/{_shard(digest)}/{digest}.webp"
+
+
+def rendition_name(digest, width, fmt):
+    return f"ad_images/r/{_shard(digest)}/{digest}_{width}.{fmt}"
+
+
+def _storage():
+    return AdImage._meta.get_field('image').storage
+
+
+def _stored_digest(storage, name):
+    h = hashlib.sha256()
+    with storage.open(name, "rb") as f:
+        for chunk in f.chunks():
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def put(name, content):
+    """
+    Write `content` under `name` unless it's already there (same hash, same
+    bytes). Returns the name the file is stored under.
+    """
+    storage = _storage()
+    if storage.exists(name):
+        return name
+
+    saved = storage.save(name, content)
+    if saved != name:
+        # An identical upload got past exists() first and the storage
+        # picked a new name for ours: keep one copy, not an orphan
+        if _stored_digest(storage, saved) == _stored_digest(storage, name):
+            storage.delete(saved)
+            return name
+    return saved
+
+
+# ---------------------------------------------
+# REFERENCE COUNTING
+# ---------------------------------------------
+def acquire(uploads):
+    """
+    uploads: [(digest, raw_name, size), ...] — one entry per new AdImage.
+    Creates missing blobs, adds one reference per entry and returns
+    {digest: ImageBlob}. Call inside the transaction that creates the rows:
+    the blob rows stay locked until it ends, so a worker can't publish a
+    blob (and delete its raw file) between here and the AdImage insert.
+    """
+    counts = Counter(digest for digest, _, _ in uploads)
+    first = {}
+    for digest, name, size in uploads:
+        first.setdefault(digest, (name, size))
+
+    ImageBlob.objects.bulk_create(
+        [ImageBlob(digest=d, raw=name, size=size) for d, (name, size) in first.items()],
+        ignore_conflicts=True,
+    )
+    ImageBlob.objects.filter(digest__in=counts).update(
+        refcount=F("refcount") + Case(
+            *[When(digest=d, then=Value(n)) for d, n in counts.items()],
+            default=Value(0),
+            output_field=IntegerField(),
+        )
+    )
+    # A locking read sees a blob a worker finished since `known` was
+    # taken, so copy_blob attaches its variants instead of the raw file
+    return {
+        b.digest: b
+        for b in ImageBlob.objects.select_for_update().filter(digest__in=counts)
+    }
+
+
+def release(blob_id):
+    """Drop one reference; delete the blob and its files once nothing uses it."""
+    release_many({blob_id: 1})
+
+
+def release_many(counts):
+    """
+    counts: {blob_id: references dropped}. One UPDATE for the refcounts,
+    one DELETE for the blobs nothing uses any more; their files go after
+    commit. Returns the number of blobs deleted.
+    """
+    if not counts:
+        return 0
+
+    ImageBlob.objects.filter(pk__in=counts).update(
+        refcount=F("refcount") - Case(
+            *[When(pk=pk, then=Value(n)) for pk, n in counts.items()],
+            default=Value(0),
+            output_field=IntegerField(),
+        )
+    )
+
+    orphans = list(
+        ImageBlob.objects
+        .filter(pk__in=counts, refcount__lte=0, images__isnull=True)
+    )
+    if not orphans:
+        return 0
+
+    names = [name for blob in orphans for name in blob.file_names()]
+    ImageBlob.objects.filter(pk__in=[blob.pk for blob in orphans]).delete()
+
+    storage = _storage()
+    transaction.on_commit(lambda: [storage.delete(n) for n in names])
+    return len(orphans)
+
+
+# ---------------------------------------------
+# ATTACHING UPLOADS
+# ---------------------------------------------
+def processed_blobs(digests):
+    return {
+        b.digest: b
+        for b in ImageBlob.objects.filter(digest__in=digests, processed=True)
+    }
+
+
+def store_raw(f, digest, known):
+    """Store the raw upload unless a finished blob already covers it."""
+    name = raw_name(digest, f.name)
+    if digest not in known:
+        name = put(name, f)
+    return (digest, name, f.size)
+
+
+def copy_blob(ad_image, blob):
+    """Point an AdImage at the blob's current files."""
+    ad_image.blob = blob
+    ad_image.image = blob.image or blob.raw
+    ad_image.webp_image = blob.webp_image or None
+    ad_image.width = blob.width
+    ad_image.height = blob.height
+    ad_image.renditions = blob.renditions
+    ad_image.processed = blob.processed
+    return ad_image
+
+
+def attach(ad_image):
+    """Single-upload path used by AdImage.save (admin uploads and the like)."""
+    upload = ad_image.image.file
+    digest = file_digest(upload)
+    stored = store_raw(upload, digest, processed_blobs([digest]))
+    return copy_blob(ad_image, acquire([stored])[digest])
+
+
+def publish(blob):
+    """Copy a finished blob's files onto every AdImage that uses it."""
+    images = AdImage.objects.filter(blob=blob)
+    post_ids = list(images.values_list("post_id", flat=True).distinct())
+    images.update(
+        image=blob.image,
+        webp_image=blob.webp_image or None,
+        width=blob.width,
+        height=blob.height,
+        renditions=blob.renditions,
+        processed=True,
+    )
+    # New file names on the page: bump the posts' validators (conditional.py)
+    AdPost.objects.filter(pk__in=post_ids).update(modified_at=timezone.now())
+    cards.invalidate(*post_ids)
+
+
+# ---------------------------------------------
+# STATISTICS
+# ---------------------------------------------
+def stats():
+    agg = ImageBlob.objects.aggregate(
+        blobs=Count("id"),
+        references=Sum("refcount"),
+        stored_bytes=Sum("size"),
+        logical_bytes=Sum(F("size") * F("refcount")),
+    )
+    blobs = agg["blobs"] or 0
+    references = agg["references"] or 0
+    stored = agg["stored_bytes"] or 0
+    logical = agg["logical_bytes"] or 0
+
+    return {
+        "blobs": blobs,
+        "references": references,
+        "legacy_images": AdImage.objects.filter(blob__isnull=True).count(),
+        "dedup_ratio": round(references / blobs, 3) if blobs else 1.0,
+        "stored_bytes": stored,
+        "logical_bytes": logical,
+        "saved_bytes": logical - stored,
+    }
@@ -0,0 +1,99 @@
+# farmclassifieds/cards.py
+
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Prefetch, prefetch_related_objects
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+
+# ---------------------------------------------
+# LISTING CARD FRAGMENT CACHE
+# ---------------------------------------------
+# Each card is rendered once and kept in Django's cache as
+#   "card:<variant>:<post id>" -> (modified_at, html)
+# A feed page fetches all its cards with ONE get_many(); only the misses
+# are rendered (and only they need their images prefetched). A cached
+# card whose modified_at no longer matches the post is treated as a miss,
+# and the AdPost / AdImage signals delete cards outright.
+
+CARD_TIMEOUT = getattr(settings, "CARD_CACHE_TIMEOUT", 60 * 60)
+
+CARD_TEMPLATES = {
+    "feed": "cards/post_card.html",
+    "search": "cards/search_card.html",
+}
+
+# Everything the card's {% responsive_image %} tag reads
+CARD_IMAGE_FIELDS = ("post", "image", "webp_image", "width", "height", "renditions")
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def card_key(variant, pk):
+    return f"card:{variant}:{pk}"
+
+
+def _count(hits, misses):
+    with _stats_lock:
+        _stats["hits"] += hits
+        _stats["misses"] += misses
+
+
+def stats():
+    """Hit / miss counters for this process."""
+    with _stats_lock:
+        hits, misses = _stats["hits"], _stats["misses"]
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": round(hits / total, 3) if total else None,
+    }
+
+
+def render_cards(posts, variant="feed"):
+    """Rendered card HTML for each post, in order."""
+    from .models import AdImage
+
+    posts = list(posts)
+    keys = [card_key(variant, post.pk) for post in posts]
+    cached = cache.get_many(keys)
+
+    html = {}
+    missed = []
+    for post, key in zip(posts, keys):
+        entry = cached.get(key)
+        if entry and entry[0] == post.modified_at:
+            html[post.pk] = entry[1]
+        else:
+            missed.append(post)
+
+    if missed:
+        if variant == "feed":
+            prefetch_related_objects(missed, Prefetch(
+                "images",
+                queryset=AdImage.objects.only(*CARD_IMAGE_FIELDS).order_by("id"),
+            ))
+
+        template = CARD_TEMPLATES[variant]
+        fresh = {}
+        for post in missed:
+            html[post.pk] = render_to_string(template, {"post": post})
+            fresh[card_key(variant, post.pk)] = (post.modified_at, html[post.pk])
+        cache.set_many(fresh, CARD_TIMEOUT)
+
+    _count(len(posts) - len(missed), len(missed))
+    return [mark_safe(html[post.pk]) for post in posts]
+
+
+def invalidate(*post_ids):
+    cache.delete_many([
+        card_key(variant, pk)
+        for pk in post_ids
+        for variant in CARD_TEMPLATES
+    ])
@@ -0,0 +1,92 @@
+# farmclassifieds/conditional.py
+
+import hashlib
+
+from django.contrib.messages import get_messages
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+
+# ---------------------------------------------
+# CONDITIONAL GET (ETag / Last-Modified)
+# ---------------------------------------------
+# Views build a Validators from data they already hold (the page rows'
+# (id, modified_at), facet counts, the image set) and return a 304
+# before any card or template rendering when the client's copy matches:
+#
+#     validators = Validators(request, keys, last_modified=...)
+#     cached = validators.not_modified()
+#     if cached:
+#         return cached
+#     return validators.apply(render(...))
+#
+# Only single-object pages (detail) send Last-Modified. A list page's
+# newest row says nothing about rows that left the page (expired,
+# rejected, moved to the next page), so lists rely on the ETag alone.
+#
+# The user id is part of every ETag (staff and owners see extra
+# controls). Pages with a pending flash message are never answered
+# with a 304, or the message would be lost.
+#
+# View counts are deliberately not part of any validator: they change
+# on every visit. view_count is written with queryset.update(), which
+# leaves modified_at alone, so a count flush does not change Last-Modified.
+
+def _has_pending_messages(request):
+    return hasattr(request, "_messages") and len(get_messages(request)) > 0
+
+
+class Validators:
+    """
+    public=True is for responses that are the same for everyone (the JSON
+    API): the ETag ignores the user and shared caches may keep the
+    response for max_age seconds.
+    """
+
+    def __init__(self, request, *parts, last_modified=None, public=False, max_age=0):
+        self.request = request
+        self.last_modified = last_modified
+        self.public = public
+        self.max_age = max_age
+
+        if not public:
+            parts = (request.user.pk, parts)
+        digest = hashlib.md5(usedforsecurity=False)
+        digest.update(repr(parts).encode())
+        self.etag = quote_etag(digest.hexdigest())
+
+    @property
+    def enabled(self):
+        if self.request.method not in ("GET", "HEAD"):
+            return False
+        # Public responses never touch the session (no "Vary: Cookie")
+        return self.public or not _has_pending_messages(self.request)
+
+    def not_modified(self):
+        """A 304 response if the client's copy is current, else None."""
+        if not self.enabled:
+            return None
+
+        # HTTP dates have whole-second precision
+        last_modified = int(self.last_modified.timestamp()) if self.last_modified else None
+        response = get_conditional_response(
+            self.request, etag=self.etag, last_modified=last_modified,
+        )
+        if response is not None:
+            self.apply(response)
+        return response
+
+    def apply(self, response):
+        if not self.enabled or response.status_code not in (200, 304):
+            return response
+
+        response.headers.setdefault("ETag", self.etag)
+        if self.last_modified:
+            response.headers.setdefault("Last-Modified", http_date(self.last_modified.timestamp()))
+        if self.public:
+            patch_cache_control(response, public=True, max_age=self.max_age)
+        else:
+            # Let browsers keep the page but always revalidate it
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
+
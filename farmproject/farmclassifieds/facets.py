@@ -0,0 +1,186 @@
+# farmclassifieds/facets.py
+
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Count, F
+from django.db.models.functions import Greatest
+
+from .models import AdPost, ListingFacet
+
+
+# ---------------------------------------------
+# DISTRICT / CATEGORY FACET COUNTS
+# ---------------------------------------------
+# ListingFacet holds the live-ad count for every district x category
+# pair; per-district and per-category totals are sums over that small
+# table. Writes keep it current with +/- deltas in their own transaction:
+# per row from the AdPost signals (signals.py), per selection through
+# tracking() on the bulk paths. refresh() recomputes the whole table with
+# one GROUP BY over the partial "live" indexes; the expiry sweeper
+# (`manage.py expire_posts`) uses it, and `manage.py refresh_facets`
+# repairs any drift. Readers get a per-process copy that is at most
+# FACET_CACHE_TTL old.
+
+FACET_CACHE_TTL = getattr(settings, "FACET_CACHE_TTL", 30)
+
+# Saves that touch none of these can't change the counts
+FACET_FIELDS = {"admin_verified", "expires_at", "is_expired", "district", "category"}
+
+# What live_pair() reads; kept in AdPost.stored
+LIVE_FIELDS = frozenset({"district", "category", "admin_verified", "is_expired"})
+
+_cache = {"at": 0.0, "data": None}
+_lock = threading.Lock()
+
+
+def refresh():
+    """Recompute the facet table from AdPost. Returns the number of pairs."""
+    rows = (
+        AdPost.objects.live()
+        .values("district", "category")
+        .annotate(n=Count("id"))
+        .order_by()
+    )
+    facets = [
+        ListingFacet(district=r["district"], category=r["category"], live_count=r["n"])
+        for r in rows
+    ]
+
+    # Zero everything, then upsert: two overlapping refreshes (or a
+    # refresh and a delta) never collide on the unique pair
+    with transaction.atomic():
+        ListingFacet.objects.update(live_count=0)
+        ListingFacet.objects.bulk_create(
+            facets,
+            update_conflicts=True,
+            unique_fields=["district", "category"],
+            update_fields=["live_count"],
+        )
+
+    clear_cache()
+    return len(facets)
+
+
+def refresh_on_commit():
+    transaction.on_commit(refresh)
+
+
+# -----------------------
+# DELTAS
+# -----------------------
+def live_pair(values):
+    """(district, category) if an ad with these values is live, else None."""
+    if values["admin_verified"] and not values["is_expired"]:
+        return values["district"], values["category"]
+    return None
+
+
+def apply(deltas, using=DEFAULT_DB_ALIAS):
+    """Add {(district, category): n} to the counts, in the caller's transaction."""
+    deltas = {pair: n for pair, n in deltas.items() if n}
+    if not deltas:
+        return
+
+    facets = ListingFacet.objects.using(using)
+    facets.bulk_create(
+        [ListingFacet(district=d, category=c) for (d, c), n in deltas.items() if n > 0],
+        ignore_conflicts=True,
+    )
+    for (district, category), n in deltas.items():
+        facets.filter(district=district, category=category).update(
+            live_count=Greatest(F("live_count") + n, 0),
+        )
+    transaction.on_commit(clear_cache, using=using)
+
+
+def move(before, after, using=DEFAULT_DB_ALIAS):
+    """One ad went from pair `before` to pair `after` (None: not live)."""
+    deltas = Counter()
+    if before:
+        deltas[before] -= 1
+    if after:
+        deltas[after] += 1
+    apply(deltas, using)
+
+
+def _live_pairs(ids, using):
+    rows = (
+        AdPost.objects.using(using).live()
+        .filter(pk__in=ids)
+        .values_list("district", "category")
+        .annotate(n=Count("id"))
+        .order_by()
+    )
+    return Counter({(district, category): n for district, category, n in rows})
+
+
+@contextmanager
+def tracking(ids, using=DEFAULT_DB_ALIAS):
+    """
+    Count what the block does to these ads (approve, renew, delete...):
+    live counts per pair before and after, applied as deltas. Use it
+    inside the transaction that makes the change.
+    """
+    ids = list(ids)
+    before = _live_pairs(ids, using)
+    yield
+    after = _live_pairs(ids, using)
+    after.subtract(before)
+    apply(after, using)
+
+
+def clear_cache():
+    with _lock:
+        _cache["at"] = 0.0
+        _cache["data"] = None
+
+
+def counts():
+    """
+    {"district": {name: n}, "category": {key: n}, "pair": {(district, key): n}}
+    """
+    now = time.monotonic()
+    with _lock:
+        if _cache["data"] is not None and now - _cache["at"] < FACET_CACHE_TTL:
+            return _cache["data"]
+
+    by_district = defaultdict(int)
+    by_category = defaultdict(int)
+    pairs = {}
+    for district, category, n in ListingFacet.objects.filter(live_count__gt=0).values_list(
+        "district", "category", "live_count"
+    ):
+        by_district[district] += n
+        by_category[category] += n
+        pairs[(district, category)] = n
+
+    data = {"district": dict(by_district), "category": dict(by_category), "pair": pairs}
+    with _lock:
+        _cache["at"] = now
+        _cache["data"] = data
+    return data
+
+
+def district_options():
+    """[(district, count), ...] for districts with live ads, A-Z."""
+    return sorted(counts()["district"].items())
+
+
+def category_options(district=None):
+    """[(key, label, count), ...] in CATEGORY_CHOICES order."""
+    data = counts()
+    if district:
+        return [
+            (key, label, data["pair"][(district, key)])
+            for key, label in AdPost.CATEGORY_CHOICES
+            if (district, key) in data["pair"]
+        ]
+    return [
+        (key, label, data["category"].get(key, 0))
+        for key, label in AdPost.CATEGORY_CHOICES
+    ]
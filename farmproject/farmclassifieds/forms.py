@@ -3,8 +3,10 @@
 from django import forms
 from django.contrib.auth.forms import AuthenticationForm
 from django.contrib.auth import get_user_model
+from PIL import Image, UnidentifiedImageError
 
-from .models import AdPost, AdImage
+from .imaging import MAX_PIXELS
+from .models import AdPost, AdImage, MAX_IMAGES_PER_POST
 from .widgets import MultiFileInput   # Ensure widgets.py exists inside same folder
 from .fields import MultiFileField
 
@@ -69,8 +71,34 @@ class AdPostForm(forms.ModelForm):
     def clean_images(self):
         files = self.files.getlist('images') if hasattr(self.files, "getlist") else []
             
-        if len(files) > 6:
-            raise forms.ValidationError("You can upload up to 6 images.")
+        if len(files) > MAX_IMAGES_PER_POST:
+            raise forms.ValidationError(f"You can upload up to {MAX_IMAGES_PER_POST} images.")
+
+        if files and self.instance.pk:
+            existing = self.instance.images.count()
+            if existing + len(files) > MAX_IMAGES_PER_POST:
+                raise forms.ValidationError(
+                    f"This ad already has {existing} image(s); "
+                    f"you can add {max(0, MAX_IMAGES_PER_POST - existing)} more."
+                )
+
+        for f in files:
+            # Header only: Image.open() reads the size without decoding
+            try:
+                width, height = Image.open(f).size
+            except Image.DecompressionBombError:
+                raise forms.ValidationError(
+                    f"{f.name} is too large; the limit is {MAX_PIXELS / 1e6:.0f}MP."
+                )
+            except (UnidentifiedImageError, OSError):
+                raise forms.ValidationError(f"{f.name} is not an image we can read.")
+            finally:
+                f.seek(0)
+            if width * height > MAX_PIXELS:
+                raise forms.ValidationError(
+                    f"{f.name} is {width}x{height} ({width * height / 1e6:.0f}MP); "
+                    f"the limit is {MAX_PIXELS / 1e6:.0f}MP."
+                )
 
         return files
 
@@ -84,12 +112,11 @@ class AdPostForm(forms.ModelForm):
 
         if commit:
             post.save()
+            self.save_images(post)
 
-            images = self.cleaned_data.get('images') or []
+        return post
 
-            for img in images:
-                AdImage.objects.create(post=post, image=img)
-    
-    
-
-        return post
\ No newline at end of file
+    def save_images(self, post):
+        """Attach the uploaded images (call after the post is saved)."""
+        images = self.cleaned_data.get('images') or []
+        return AdImage.objects.ingest(post, images)
@@ -0,0 +1,48 @@
+# farmclassifieds/geo.py
+
+import math
+
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import ASin, Cos, Power, Radians, Sin, Sqrt
+
+
+# ---------------------------------------------
+# RADIUS SEARCH HELPERS
+# ---------------------------------------------
+# Ads carry the centroid of their postcode (PostcodeCentroid, loaded from
+# a local CSV by `manage.py load_postcodes`). A radius query is
+#   1. a bounding box on (latitude, longitude), which the partial
+#      adpost_live_geo_idx can seek, then
+#   2. an exact haversine distance on the few rows left.
+# The trig functions are plain Django database functions, so the same
+# SQL runs on SQLite and PostgreSQL.
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = EARTH_RADIUS_KM * math.pi / 180  # ~111.2 km per degree of latitude
+
+
+def bounding_box(lat, lon, km):
+    """(min_lat, max_lat, min_lon, max_lon) enclosing the circle."""
+    dlat = km / KM_PER_DEGREE
+    # Degrees of longitude shrink towards the poles
+    dlon = km / (KM_PER_DEGREE * max(math.cos(math.radians(lat)), 0.01))
+    return lat - dlat, lat + dlat, lon - dlon, lon + dlon
+
+
+def haversine(lat, lon, lat_field="latitude", lon_field="longitude"):
+    """Great-circle distance in km from (lat, lon) to each row."""
+    dlat = Radians(F(lat_field) - Value(lat)) / 2
+    dlon = Radians(F(lon_field) - Value(lon)) / 2
+    a = (
+        Power(Sin(dlat), 2)
+        + Value(math.cos(math.radians(lat))) * Cos(Radians(F(lat_field))) * Power(Sin(dlon), 2)
+    )
+    return Value(2 * EARTH_RADIUS_KM) * ASin(Sqrt(a), output_field=FloatField())
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Same formula in Python (tests, the seeder, sanity checks)."""
+    dlat = math.radians(lat2 - lat1) / 2
+    dlon = math.radians(lon2 - lon1) / 2
+    a = math.sin(dlat) ** 2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlon) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
@@ -0,0 +1,226 @@
+# farmclassifieds/imaging.py
+
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image
+
+
+# ---------------------------------------------
+# IMAGE VARIANTS (compressed JPEG + WebP)
+# ---------------------------------------------
+# encode_variants() is pure PIL work on bytes, so the process_images
+# command can run it in a process pool. apply_variants() runs back in
+# the parent and writes the files / row through the ORM.
+
+JPEG_QUALITY = 75
+WEBP_QUALITY = 70
+
+# Width renditions for srcset (never upscaled past the original)
+RENDITION_WIDTHS = tuple(getattr(settings, "IMAGE_RENDITION_WIDTHS", (320, 640, 1280)))
+
+# Longest side we keep. A 48MP phone photo is ~150MB as an RGB buffer;
+# nobody needs more than this on a listing page.
+MAX_DIMENSION = getattr(settings, "IMAGE_MAX_DIMENSION", 2560)
+
+# Refuse anything larger before decoding a single pixel
+MAX_PIXELS = getattr(settings, "IMAGE_MAX_PIXELS", 64_000_000)
+
+
+def open_bounded(data, max_dimension=MAX_DIMENSION, max_pixels=MAX_PIXELS):
+    """
+    Decode an upload without ever holding the full-resolution bitmap:
+      * the pixel count is checked from the header alone,
+      * JPEGs are decoded at 1/2, 1/4 or 1/8 scale via draft(),
+      * the result is shrunk to max_dimension before any encoding.
+    """
+    img = Image.open(BytesIO(data))
+
+    width, height = img.size
+    if width * height > max_pixels:
+        raise ValueError(
+            f"Image is {width}x{height} ({width * height / 1e6:.0f}MP); "
+            f"the limit is {max_pixels / 1e6:.0f}MP."
+        )
+
+    scale = max_dimension / max(width, height)
+    if scale < 1:
+        target = (max(1, int(width * scale)), max(1, int(height * scale)))
+        # JPEG only: pick the smallest DCT scale that is still >= target
+        img.draft('RGB', target)
+
+    img = img.convert('RGB')
+
+    if max(img.size) > max_dimension:
+        img.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+
+    return img
+
+
+def _encode(img, fmt):
+    out = BytesIO()
+    if fmt == 'JPEG':
+        img.save(out, format='JPEG', quality=JPEG_QUALITY, optimize=True)
+    else:
+        img.save(out, format='WEBP', quality=WEBP_QUALITY, method=6)
+    return out.getvalue()
+
+
+def _encode_webp(img):
+    try:
+        return _encode(img, 'WEBP')
+    except OSError:
+        return None
+
+
+def encode_variants(data, widths=RENDITION_WIDTHS, full=True):
+    """
+    Raw upload bytes -> {
+        "size": (w, h),
+        "jpg": bytes, "webp": bytes or None,          # only when full=True
+        "renditions": [{"w", "h", "jpg", "webp"}, ...],
+    }
+    """
+    img = open_bounded(data)
+
+    result = {"size": img.size, "renditions": []}
+
+    if full:
+        result["jpg"] = _encode(img, 'JPEG')
+        result["webp"] = _encode_webp(img)
+
+    # An image no wider than the smallest width gets no renditions; its
+    # recorded size is what tells --missing-renditions it was done.
+    for width in sorted(widths):
+        if width >= img.width:
+            break
+        height = round(img.height * width / img.width)
+        small = img.resize((width, height), Image.LANCZOS)
+        result["renditions"].append({
+            "w": width,
+            "h": height,
+            "jpg": _encode(small, 'JPEG'),
+            "webp": _encode_webp(small),
+        })
+
+    return result
+
+
+def _still_owned(job):
+    """
+    Renew the job's claim, but only if it is still the same claim: a
+    stale job can be requeued and taken by another worker while this one
+    was still encoding it. The conditional UPDATE also locks the row until
+    the caller's transaction ends, so a requeue can't slip in between.
+    """
+    from .models import ImageJob
+
+    return ImageJob.objects.filter(
+        pk=job.pk,
+        status=ImageJob.RUNNING,
+        worker=job.worker,
+        attempts=job.attempts,
+    ).update(locked_at=timezone.now()) == 1
+
+
+def apply_variants(ad_image, variants, job=None):
+    """
+    Store encoded variants and swap them in for the raw upload. With a
+    job, does nothing (and returns False) unless that job is still owned
+    by the worker that claimed it.
+    """
+    from .models import ImageBlob
+
+    with transaction.atomic():
+        if job is not None and not _still_owned(job):
+            return False
+        if ad_image.blob_id:
+            # Lock the blob first: an ingest of the same bytes waits in
+            # acquire() and then sees it processed, or commits its
+            # unprocessed rows before we get here and publish() covers them
+            blob = ImageBlob.objects.select_for_update().get(pk=ad_image.blob_id)
+            _apply_to_blob(blob, variants)
+        else:
+            _apply_to_image(ad_image, variants)
+    return True
+
+
+def _apply_to_image(ad_image, variants):
+    # Images from before content addressing keep their own file names
+    raw_name = ad_image.image.name
+    storage = ad_image.image.storage
+    base_name = os.path.splitext(os.path.basename(raw_name))[0]
+
+    if "jpg" in variants:
+        ad_image.image.save(base_name + ".jpg", ContentFile(variants["jpg"]), save=False)
+    if variants.get("webp"):
+        ad_image.webp_image.save(base_name + ".webp", ContentFile(variants["webp"]), save=False)
+
+    renditions = []
+    for r in variants["renditions"]:
+        entry = {"w": r["w"], "h": r["h"]}
+        for fmt in ("jpg", "webp"):
+            if r[fmt]:
+                name = os.path.join('ad_images', 'r', f"{base_name}_{r['w']}.{fmt}")
+                entry[fmt] = storage.save(name, ContentFile(r[fmt]))
+        renditions.append(entry)
+
+    ad_image.width, ad_image.height = variants["size"]
+    ad_image.renditions = renditions
+    ad_image.processed = True
+    ad_image.save(update_fields=[
+        "image", "webp_image", "width", "height", "renditions", "processed",
+    ])
+
+    if raw_name != ad_image.image.name:
+        transaction.on_commit(lambda: storage.delete(raw_name))
+
+
+def _apply_to_blob(blob, variants):
+    from . import blobstore
+    from .models import AdImage
+
+    digest = blob.digest
+
+    if "jpg" in variants:
+        blob.image = blobstore.put(blobstore.jpg_name(digest), ContentFile(variants["jpg"]))
+        blob.webp_image = ""
+        if variants.get("webp"):
+            blob.webp_image = blobstore.put(blobstore.webp_name(digest), ContentFile(variants["webp"]))
+
+    renditions = []
+    for r in variants["renditions"]:
+        entry = {"w": r["w"], "h": r["h"]}
+        for fmt in ("jpg", "webp"):
+            if r[fmt]:
+                entry[fmt] = blobstore.put(
+                    blobstore.rendition_name(digest, r["w"], fmt), ContentFile(r[fmt]),
+                )
+        renditions.append(entry)
+
+    blob.width, blob.height = variants["size"]
+    blob.renditions = renditions
+    blob.processed = True
+    blob.save(update_fields=[
+        "image", "webp_image", "width", "height", "renditions", "processed",
+    ])
+
+    # Every AdImage sharing these bytes (re-posts, duplicate uploads
+    # still waiting in the queue) gets the variants at once.
+    blobstore.publish(blob)
+
+    storage = blobstore._storage()
+    raw_name = blob.raw
+
+    def delete_raw():
+        if storage.exists(raw_name):
+            storage.delete(raw_name)
+
+    # Still under the blob's lock: anything pointing at the raw file now
+    # (an image outside publish(), say) keeps it
+    if raw_name != blob.image and not AdImage.objects.filter(image=raw_name).exists():
+        transaction.on_commit(delete_raw)
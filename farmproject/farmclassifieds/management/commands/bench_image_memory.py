@@ -0,0 +1,93 @@
+# farmclassifieds/management/commands/bench_image_memory.py
+
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+from django.core.management.base import BaseCommand
+from PIL import Image
+
+from farmclassifieds.imaging import encode_variants
+
+
+def _legacy_encode(data):
+    """The old AdImage.save path: full-resolution decode, then encode."""
+    img = Image.open(BytesIO(data))
+    img = img.convert('RGB')
+    img.save(BytesIO(), format='JPEG', quality=75, optimize=True)
+    img.save(BytesIO(), format='WEBP', quality=70, method=6)
+
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # KB on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _measure(mode, path):
+    # Read in the child: pickling a big payload across would skew the peak
+    with open(path, "rb") as f:
+        data = f.read()
+
+    started = time.perf_counter()
+    if mode == "legacy":
+        _legacy_encode(data)
+    elif mode == "bounded":
+        encode_variants(data)
+    return _peak_rss_mb(), time.perf_counter() - started
+
+
+def _write_synthetic(path, megapixels):
+    width = int((megapixels * 1e6 * 4 / 3) ** 0.5)
+    height = int(width * 3 / 4)
+    img = Image.effect_noise((width // 8, height // 8), 40).resize((width, height))
+    Image.merge("RGB", (img, img.rotate(180), img)).save(path, format="JPEG", quality=90)
+
+
+class Command(BaseCommand):
+    help = (
+        "Peak RSS per upload for the old full-resolution decode vs. the "
+        "bounded decode path (draft + max dimension). Each run happens in "
+        "a fresh process so the numbers don't bleed into each other."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("files", nargs="*", help="JPEG/PNG files to measure.")
+        parser.add_argument(
+            "--megapixels",
+            type=int,
+            default=48,
+            help="Size of the synthetic camera JPEG used when no files are given.",
+        )
+
+    def handle(self, *args, **options):
+        # Linux carries ru_maxrss across fork/exec, so this process must
+        # stay small: even the synthetic photo is built in a child.
+        ctx = multiprocessing.get_context("spawn")
+
+        def run(fn, *args):
+            with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+                return pool.submit(fn, *args).result()
+
+        samples = [(path, path) for path in options["files"]]
+        if not samples:
+            path = os.path.join(tempfile.gettempdir(), f"bench_{options['megapixels']}mp.jpg")
+            run(_write_synthetic, path, options["megapixels"])
+            samples = [(f"synthetic {options['megapixels']}MP", path)]
+
+        self.stdout.write(
+            f"{'upload':32} {'mode':8} {'peak RSS MB':>12} {'per upload MB':>14} {'seconds':>8}"
+        )
+        for label, path in samples:
+            # Same process setup and payload, no decode: the baseline
+            idle, _ = run(_measure, "idle", path)
+            for mode in ("legacy", "bounded"):
+                peak, seconds = run(_measure, mode, path)
+                self.stdout.write(
+                    f"{label[-32:]:32} {mode:8} {peak:12.1f} {peak - idle:14.1f} {seconds:8.2f}"
+                )
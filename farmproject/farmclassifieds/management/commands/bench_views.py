@@ -0,0 +1,262 @@
+# farmclassifieds/management/commands/bench_views.py
+
+import io
+import json
+import platform
+import random
+import re
+import statistics
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+
+from farmclassifieds import moderation
+from farmclassifieds.models import AdPost, User
+from farmclassifieds.pagination import SORT_KEYS
+
+
+BENCH_SELLER = "bench_seller"
+BENCH_TITLE = "Benchmark listing"
+
+SCENARIOS = ("post_list", "post_list_page2", "search_results", "post_detail", "post_create")
+
+# Anything else counts as an error (e.g. a 200 from post_create is a form error)
+EXPECTED_STATUS = {"post_create": 302}
+
+NEXT_LINK = re.compile(r'href="\?([^"]*)">Next')
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    k = (len(sorted_values) - 1) * pct / 100
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, timeout=5, cwd=settings.BASE_DIR,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Drives post_list, search_results, post_detail and post_create "
+        "through the Django test client with N concurrent clients and "
+        "prints p50/p95/p99 latency, queries per request and throughput "
+        "as JSON. Seed data first (manage.py seed_data). Ads created by "
+        "the post_create scenario are deleted at the end."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200, help="Measured requests per scenario.")
+        parser.add_argument("--concurrency", type=int, default=4)
+        parser.add_argument("--warmup", type=int, default=20, help="Unmeasured requests per scenario.")
+        parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument("--host", help="Host header (defaults to the first ALLOWED_HOSTS entry).")
+        parser.add_argument("--output", help="Write the JSON report here as well.")
+
+    def handle(self, *args, **options):
+        scenarios = [s.strip() for s in options["scenarios"].split(",") if s.strip()]
+        unknown = set(scenarios) - set(SCENARIOS)
+        if unknown:
+            raise CommandError(f"Unknown scenario(s): {', '.join(sorted(unknown))}")
+
+        self.rng = random.Random(options["seed"])
+        self.host = options["host"] or self.default_host()
+        self.prepare_data()
+
+        results = {}
+        try:
+            for name in scenarios:
+                self.stderr.write(f"{name}...")
+                run = getattr(self, f"scenario_{name}")
+                expected = EXPECTED_STATUS.get(name, 200)
+                self.drive(run, expected, options["warmup"], options["concurrency"])
+                results[name] = self.drive(run, expected, options["requests"], options["concurrency"])
+        finally:
+            moderation.reject(AdPost.objects.filter(created_by=self.seller, title=BENCH_TITLE))
+
+        report = {
+            "meta": {
+                "revision": _git_revision(),
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "database": connection.vendor,
+                "debug": settings.DEBUG,
+                "live_ads": self.live_count,
+                "requests": options["requests"],
+                "concurrency": options["concurrency"],
+                "started": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            },
+            "scenarios": results,
+        }
+
+        text = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                f.write(text + "\n")
+        self.stdout.write(text)
+
+    # -----------------------
+    # SETUP
+    # -----------------------
+    def default_host(self):
+        for host in settings.ALLOWED_HOSTS:
+            if host and host != "*" and not host.startswith("."):
+                return host
+        return "localhost"
+
+    def prepare_data(self):
+        live = AdPost.objects.live()
+        self.live_count = live.count()
+        if not self.live_count:
+            raise CommandError("No live ads. Run `manage.py seed_data` first.")
+
+        # A sample of ids / districts to pick from (not the whole table)
+        self.post_ids = list(live.order_by("-created_at").values_list("pk", flat=True)[:5000])
+        self.districts = list(live.order_by().values_list("district", flat=True).distinct()[:50])
+        self.categories = [key for key, _ in AdPost.CATEGORY_CHOICES]
+
+        self.seller, _ = User.objects.get_or_create(
+            username=BENCH_SELLER,
+            defaults={"phone_number": "0000000000", "is_verified_seller": True},
+        )
+        self.seller.ad_post_limit = 10 ** 6
+        self.seller.save(update_fields=["ad_post_limit"])
+
+        out = io.BytesIO()
+        Image.new("RGB", (1200, 900), (90, 140, 60)).save(out, format="JPEG", quality=80)
+        self.upload = out.getvalue()
+
+        self.local = threading.local()
+
+    def client(self):
+        # One client (cookies, session) per worker thread
+        if not hasattr(self.local, "client"):
+            self.local.client = Client(HTTP_HOST=self.host)
+            self.local.seller = Client(HTTP_HOST=self.host)
+            self.local.seller.force_login(self.seller)
+        return self.local.client
+
+    # -----------------------
+    # SCENARIOS
+    # -----------------------
+    # Each returns a response, or a callable making the request to time
+    # (untimed setup first), or None to skip the sample.
+    # -----------------------
+    def _pick(self, values):
+        return values[self.rng.randrange(len(values))]
+
+    def scenario_post_list(self):
+        params = {"sort": self._pick(list(SORT_KEYS))}
+        if self.rng.random() < 0.5:
+            params["district"] = self._pick(self.districts)
+        if self.rng.random() < 0.3:
+            params["category"] = self._pick(self.categories)
+        return self.client().get(reverse("post_list"), params)
+
+    def scenario_post_list_page2(self):
+        client = self.client()
+        first = client.get(reverse("post_list"), {"sort": self._pick(list(SORT_KEYS))})
+        # Follow the "Next" link like a user would; only that request is timed
+        match = NEXT_LINK.search(first.content.decode())
+        if not match:
+            return None
+        query = match.group(1).replace("&amp;", "&")
+        return lambda: client.get(reverse("post_list") + "?" + query)
+
+    def scenario_search_results(self):
+        params = {}
+        roll = self.rng.random()
+        if roll < 0.4:
+            params["q"] = self._pick(("goat", "buffalo", "chicks", "banana", "puppies", "karimeen"))
+        if roll > 0.2:
+            params["district"] = self._pick(self.districts)
+        if self.rng.random() < 0.5:
+            params["category"] = self._pick(self.categories)
+        params["sort"] = self._pick(("new", "price_low", "price_high"))
+        return self.client().get(reverse("search_results"), params)
+
+    def scenario_post_detail(self):
+        return self.client().get(reverse("post_detail", args=[self._pick(self.post_ids)]))
+
+    def scenario_post_create(self):
+        self.client()
+        return self.local.seller.post(reverse("post_create"), {
+            "title": BENCH_TITLE,
+            "contents": "Created by bench_views.",
+            "category": self._pick(self.categories),
+            "phone_number": "9000000000",
+            "postcode": "686001",
+            "district": self._pick(self.districts),
+            "price": "1000",
+            "images": [SimpleUploadedFile("bench.jpg", self.upload, "image/jpeg")],
+        })
+
+    # -----------------------
+    # DRIVER
+    # -----------------------
+    def _timed(self, run, expected):
+        # The log is a bounded deque; once full, captured slices come back empty
+        connection.queries_log.clear()
+        started = time.perf_counter()
+        with CaptureQueriesContext(connection) as queries:
+            response = run()
+            if callable(response):
+                # Only the follow-up request counts
+                queries.initial_queries = len(connection.queries_log)
+                started = time.perf_counter()
+                response = response()
+        elapsed = time.perf_counter() - started
+        if response is None:
+            return None
+        return elapsed, len(queries.captured_queries), response.status_code != expected
+
+    def drive(self, run, expected, count, concurrency):
+        if count <= 0:
+            return None
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            samples = [s for s in pool.map(lambda _: self._timed(run, expected), range(count)) if s]
+            wall = time.perf_counter() - started
+            # One task per worker: close each thread's own DB connection
+            barrier = threading.Barrier(concurrency)
+            list(pool.map(lambda _: (barrier.wait(), connection.close()), range(concurrency)))
+        if not samples:
+            return None
+
+        latencies = sorted(s[0] * 1000 for s in samples)
+        queries = [s[1] for s in samples]
+        errors = sum(1 for s in samples if s[2])
+
+        return {
+            "requests": len(samples),
+            "errors": errors,
+            "p50_ms": round(_percentile(latencies, 50), 2),
+            "p95_ms": round(_percentile(latencies, 95), 2),
+            "p99_ms": round(_percentile(latencies, 99), 2),
+            "mean_ms": round(statistics.fmean(latencies), 2),
+            "queries_mean": round(statistics.fmean(queries), 2),
+            "queries_max": max(queries),
+            "throughput_rps": round(len(samples) / wall, 1),
+        }
@@ -0,0 +1,86 @@
+# farmclassifieds/management/commands/expire_posts.py
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from farmclassifieds import facets
+from farmclassifieds.models import AdPost
+
+
+class Command(BaseCommand):
+    help = (
+        "Flags ads whose expires_at has passed (is_expired=True) in small "
+        "batches. Safe to run from cron: each batch is its own short "
+        "transaction, and an interrupted run simply picks up the remaining "
+        "rows next time."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch", type=int, default=1000, help="Rows per UPDATE.")
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=0.0,
+            help="Seconds to pause between batches so other writers get the lock.",
+        )
+
+    def handle(self, *args, **options):
+        # Fixed cutoff: rows that expire while we run wait for the next run,
+        # so the walk always terminates.
+        cutoff = timezone.now()
+        batch_size = options["batch"]
+
+        total = batches = 0
+        cursor = None
+        started = time.perf_counter()
+
+        while True:
+            # Keyset walk over adpost_unexpired_idx (expires_at, id)
+            due = AdPost.objects.due_to_expire(cutoff).order_by("expires_at", "id")
+            if cursor:
+                expires_at, pk = cursor
+                due = due.filter(
+                    Q(expires_at__gt=expires_at) | Q(expires_at=expires_at, id__gt=pk)
+                )
+            keys = list(due.values_list("expires_at", "id")[:batch_size])
+            if not keys:
+                break
+
+            batch_started = time.perf_counter()
+            with transaction.atomic():
+                # Re-check the condition: a seller may have renewed meanwhile
+                flagged = (
+                    AdPost.objects.due_to_expire(cutoff)
+                    .filter(pk__in=[pk for _, pk in keys])
+                    .update(is_expired=True)
+                )
+            elapsed = time.perf_counter() - batch_started
+
+            total += flagged
+            batches += 1
+            cursor = keys[-1]
+
+            if options["verbosity"] >= 2:
+                self.stdout.write(
+                    f"batch {batches}: {flagged} rows in {elapsed * 1000:.0f}ms "
+                    f"(up to id {cursor[1]})"
+                )
+
+            if len(keys) < batch_size:
+                break
+            if options["sleep"]:
+                time.sleep(options["sleep"])
+
+        if total:
+            facets.refresh()
+
+        seconds = time.perf_counter() - started
+        rate = total / seconds if seconds else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Expired {total} ads in {batches} batch(es), "
+            f"{seconds:.2f}s ({rate:.0f} rows/sec)."
+        ))
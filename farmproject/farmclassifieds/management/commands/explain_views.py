@@ -0,0 +1,121 @@
+# farmclassifieds/management/commands/explain_views.py
+
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+
+from farmclassifieds.models import AdPost
+
+
+# Plan fragments that mean "read every row of the ads table"
+FULL_SCAN_MARKERS = (
+    "SCAN farmclassifieds_adpost",          # SQLite (without "USING ... INDEX")
+    "Seq Scan on farmclassifieds_adpost",   # PostgreSQL
+)
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs every public listing view once and prints the EXPLAIN plan of "
+        "each AdPost query it issues. Full table scans are flagged. "
+        "Note: PostgreSQL picks a Seq Scan on tiny tables regardless of "
+        "indexes, so run this against realistic data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--district", help="District to use for filtered views.")
+        parser.add_argument("--category", default="goat", help="Category to use for filtered views.")
+        parser.add_argument("--postcode", default="686", help="Postcode to use for filtered views.")
+        parser.add_argument(
+            "--strict",
+            action="store_true",
+            help="Exit with an error if any query falls back to a full table scan.",
+        )
+
+    def handle(self, *args, **options):
+        district = options["district"] or (
+            AdPost.objects.live().values_list("district", flat=True).first() or "Kottayam"
+        )
+        category = options["category"]
+        postcode = options["postcode"]
+        post = AdPost.objects.live().only("pk").first()
+
+        pages = [
+            (reverse("post_list"), {}),
+            (reverse("post_list"), {"sort": "price_low"}),
+            (reverse("post_list"), {"district": district, "category": category}),
+            (reverse("filtered_view"), {"category": category}),
+            (reverse("search_results"), {"district": district, "category": category}),
+            (reverse("search_results"), {"district": district, "sort": "price_high"}),
+            (reverse("search_results"), {"postcode": postcode}),
+            (reverse("select_category", args=[district]), {}),
+            (reverse("posts_by_location", args=[district, category]), {}),
+        ]
+        if post:
+            pages.append((reverse("post_detail", args=[post.pk]), {}))
+
+        full_scans = []
+
+        # Views like post_detail have side effects (view counts), so the
+        # whole run is rolled back.
+        try:
+            with transaction.atomic():
+                for path, params in pages:
+                    full_scans += self.explain_page(path, params)
+                raise _Rollback
+        except _Rollback:
+            pass
+
+        if full_scans:
+            self.stdout.write(self.style.WARNING(
+                f"{len(full_scans)} full table scan(s): {', '.join(full_scans)}"
+            ))
+            if options["strict"]:
+                raise CommandError("Some public views scan the whole AdPost table.")
+        else:
+            self.stdout.write(self.style.SUCCESS("No full table scans on AdPost."))
+
+    def explain_page(self, path, params):
+        request = RequestFactory().get(path, params)
+        request.user = AnonymousUser()
+        request.session = SessionStore()
+        match = resolve(path)
+
+        with CaptureQueriesContext(connection) as ctx:
+            match.func(request, *match.args, **match.kwargs)
+
+        label = f"{match.url_name} {request.get_full_path()}"
+        self.stdout.write(self.style.MIGRATE_HEADING(f"\n=== {label}"))
+
+        full_scans = []
+        prefix = connection.ops.explain_query_prefix()
+
+        for query in ctx.captured_queries:
+            sql = query["sql"]
+            if not sql.startswith("SELECT") or "farmclassifieds_adpost" not in sql:
+                continue
+
+            with connection.cursor() as cursor:
+                cursor.execute(f"{prefix} {sql}")
+                plan = "\n".join(" ".join(str(col) for col in row) for row in cursor.fetchall())
+
+            self.stdout.write(sql)
+            self.stdout.write(plan)
+
+            if any(
+                marker in line and "INDEX" not in line
+                for line in plan.splitlines()
+                for marker in FULL_SCAN_MARKERS
+            ):
+                full_scans.append(match.url_name)
+                self.stdout.write(self.style.ERROR("  ^ full table scan"))
+
+        return full_scans
@@ -0,0 +1,29 @@
+# farmclassifieds/management/commands/image_dedup_stats.py
+
+import json
+
+from django.core.management.base import BaseCommand
+
+from farmclassifieds import blobstore
+
+
+class Command(BaseCommand):
+    help = "Shows how much the content-addressed image store deduplicates."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--json", action="store_true", help="Print the raw numbers as JSON.")
+
+    def handle(self, *args, **options):
+        stats = blobstore.stats()
+
+        if options["json"]:
+            self.stdout.write(json.dumps(stats))
+            return
+
+        mb = 1024 * 1024
+        self.stdout.write(f"Distinct uploads (blobs):   {stats['blobs']}")
+        self.stdout.write(f"Images referencing them:    {stats['references']}")
+        self.stdout.write(f"Dedup ratio:                {stats['dedup_ratio']:.2f}x")
+        self.stdout.write(f"Upload MB stored / offered: {stats['stored_bytes'] / mb:.1f} / {stats['logical_bytes'] / mb:.1f}")
+        self.stdout.write(f"Saved by dedup:             {stats['saved_bytes'] / mb:.1f} MB")
+        self.stdout.write(f"Pre-dedup images (no blob): {stats['legacy_images']}")
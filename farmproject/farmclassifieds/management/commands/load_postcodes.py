@@ -0,0 +1,121 @@
+# farmclassifieds/management/commands/load_postcodes.py
+
+import csv
+import time
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+
+from farmclassifieds.models import AdPost, PostcodeCentroid, normalize_postcode
+
+
+# Accepted header names (case-insensitive), e.g. the India Post pincode
+# directory uses "pincode" / "latitude" / "longitude".
+POSTCODE_COLUMNS = ("postcode", "pincode", "pin", "zip", "zipcode")
+LATITUDE_COLUMNS = ("latitude", "lat")
+LONGITUDE_COLUMNS = ("longitude", "lon", "lng", "long")
+
+
+def _column(header, names):
+    lowered = {h.strip().lower(): h for h in header}
+    for name in names:
+        if name in lowered:
+            return lowered[name]
+    return None
+
+
+def _coordinate(raw, limit):
+    try:
+        value = float(raw)
+    except (TypeError, ValueError):
+        return None
+    # Directories use 0 / NA for "unknown"; NaN fails the range check
+    if not -limit <= value <= limit or value == 0:
+        return None
+    return value
+
+
+class Command(BaseCommand):
+    help = (
+        "Loads postcode centroids from a local CSV (postcode, latitude, "
+        "longitude columns; several rows per postcode are averaged) and "
+        "fills AdPost.latitude/longitude. No external geocoding service."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("csv_path")
+        parser.add_argument("--batch", type=int, default=5000, help="Rows per INSERT / UPDATE.")
+        parser.add_argument(
+            "--skip-posts",
+            action="store_true",
+            help="Only load the centroid table; don't update existing ads.",
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        centroids = self.read_csv(options["csv_path"])
+        if not centroids:
+            raise CommandError("No usable postcode rows found.")
+
+        PostcodeCentroid.objects.bulk_create(
+            [PostcodeCentroid(postcode=pc, latitude=lat, longitude=lon)
+             for pc, (lat, lon) in centroids.items()],
+            batch_size=options["batch"],
+            update_conflicts=True,
+            unique_fields=["postcode"],
+            update_fields=["latitude", "longitude"],
+        )
+        self.stdout.write(f"Loaded {len(centroids)} postcode centroids.")
+
+        if not options["skip_posts"]:
+            updated = self.backfill_posts(options["batch"])
+            self.stdout.write(f"Located {updated} ads.")
+
+        self.stdout.write(self.style.SUCCESS(f"Done in {time.perf_counter() - started:.1f}s."))
+
+    def read_csv(self, path):
+        sums = defaultdict(lambda: [0.0, 0.0, 0])
+
+        try:
+            f = open(path, newline="", encoding="utf-8-sig")
+        except OSError as e:
+            raise CommandError(str(e))
+
+        with f:
+            reader = csv.DictReader(f)
+            header = reader.fieldnames or []
+            postcode_col = _column(header, POSTCODE_COLUMNS)
+            lat_col = _column(header, LATITUDE_COLUMNS)
+            lon_col = _column(header, LONGITUDE_COLUMNS)
+            if not (postcode_col and lat_col and lon_col):
+                raise CommandError(
+                    f"Need postcode, latitude and longitude columns; got {', '.join(header)}."
+                )
+
+            for row in reader:
+                postcode = normalize_postcode(row.get(postcode_col))
+                lat = _coordinate(row.get(lat_col), 90)
+                lon = _coordinate(row.get(lon_col), 180)
+                if not postcode or lat is None or lon is None:
+                    continue
+                entry = sums[postcode]
+                entry[0] += lat
+                entry[1] += lon
+                entry[2] += 1
+
+        return {pc: (lat / n, lon / n) for pc, (lat, lon, n) in sums.items()}
+
+    def backfill_posts(self, batch_size):
+        """Copy centroids onto ads in id-range batches (short write locks)."""
+        centroid = PostcodeCentroid.objects.filter(postcode=OuterRef("postcode_digits"))
+        last_id = AdPost.objects.order_by("-id").values_list("id", flat=True).first() or 0
+
+        for start in range(0, last_id, batch_size):
+            with transaction.atomic():
+                AdPost.objects.filter(id__gt=start, id__lte=start + batch_size).update(
+                    latitude=Subquery(centroid.values("latitude")[:1]),
+                    longitude=Subquery(centroid.values("longitude")[:1]),
+                )
+        return AdPost.objects.filter(latitude__isnull=False).count()
@@ -0,0 +1,192 @@
+# farmclassifieds/management/commands/process_images.py
+
+import os
+import socket
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.db.models import F
+from django.utils import timezone
+
+from farmclassifieds import blobstore
+from farmclassifieds.imaging import RENDITION_WIDTHS, apply_variants, encode_variants
+from farmclassifieds.models import AdImage, ImageJob
+
+
+MAX_ATTEMPTS = 3
+
+# A RUNNING job older than this belongs to a worker that died
+STALE_AFTER = timedelta(minutes=10)
+
+
+class Command(BaseCommand):
+    help = (
+        "Image worker: claims pending ImageJobs from the database queue, "
+        "encodes the compressed JPEG / WebP variants and srcset renditions "
+        "in a process pool and updates the AdImage rows. Run it under a "
+        "supervisor, or with --once from cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+        parser.add_argument("--batch", type=int, default=12, help="Jobs claimed per round.")
+        parser.add_argument("--sleep", type=float, default=2.0, help="Idle poll interval in seconds.")
+        parser.add_argument("--once", action="store_true", help="Drain the queue, then exit.")
+        parser.add_argument(
+            "--missing-renditions",
+            action="store_true",
+            help="First queue a job for every processed image that has no srcset renditions yet.",
+        )
+
+    def handle(self, *args, **options):
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+
+        if options["missing_renditions"]:
+            self.enqueue_missing_renditions()
+
+        with ProcessPoolExecutor(max_workers=options["workers"]) as pool:
+            while True:
+                close_old_connections()
+                self.requeue_stale()
+
+                jobs = self.claim(options["batch"])
+                if jobs:
+                    self.run_batch(pool, jobs)
+                    continue
+
+                if options["once"]:
+                    break
+                time.sleep(options["sleep"])
+
+    def enqueue_missing_renditions(self):
+        queued = ImageJob.objects.filter(status__in=[ImageJob.PENDING, ImageJob.RUNNING])
+        images = (
+            AdImage.objects
+            .filter(processed=True, renditions=[])
+            # Narrower than the smallest width: already done, with nothing
+            # to add (width is only recorded once the variants are written)
+            .exclude(width__lte=min(RENDITION_WIDTHS))
+            .exclude(jobs__in=queued)
+            .values_list("id", flat=True)
+        )
+        jobs = ImageJob.objects.bulk_create(
+            [ImageJob(image_id=pk) for pk in images.iterator()],
+            batch_size=500,
+        )
+        self.stdout.write(f"Queued {len(jobs)} image(s) for renditions.")
+
+    def requeue_stale(self):
+        """
+        Hand stale jobs back to the queue. The old worker may only be slow,
+        not dead: apply_variants() checks the claim before writing, so
+        whichever run loses the job drops its result.
+        """
+        stale = ImageJob.objects.filter(
+            status=ImageJob.RUNNING,
+            locked_at__lt=timezone.now() - STALE_AFTER,
+        )
+        stale.filter(attempts__gte=MAX_ATTEMPTS).update(
+            status=ImageJob.FAILED, worker="", error="Worker timed out",
+        )
+        stale.update(status=ImageJob.PENDING, worker="")
+
+    def claim(self, size):
+        """
+        Claim up to `size` pending jobs. The UPDATE only touches rows that
+        are still pending, and each round uses a fresh token, so two
+        workers never pick up the same job.
+        """
+        token = f"{self.worker_id}:{uuid.uuid4().hex[:8]}"
+        ids = list(
+            ImageJob.objects
+            .filter(status=ImageJob.PENDING)
+            .order_by("id")
+            .values_list("id", flat=True)[:size]
+        )
+        if not ids:
+            return []
+
+        ImageJob.objects.filter(id__in=ids, status=ImageJob.PENDING).update(
+            status=ImageJob.RUNNING,
+            worker=token,
+            locked_at=timezone.now(),
+            attempts=F("attempts") + 1,
+        )
+        return list(
+            ImageJob.objects
+            .filter(worker=token, status=ImageJob.RUNNING)
+            .select_related("image__blob")
+        )
+
+    def run_batch(self, pool, jobs):
+        futures = []
+        followers = []
+        in_batch = set()
+
+        for job in jobs:
+            blob = job.image.blob
+            if blob and not job.image.processed:
+                if blob.processed:
+                    # Same bytes were encoded for an earlier upload: reuse
+                    blobstore.publish(blob)
+                    self.done(job)
+                    continue
+                if blob.pk in in_batch:
+                    # Duplicate upload in this batch; the first one's
+                    # apply_variants() publishes to it as well
+                    followers.append(job)
+                    continue
+                in_batch.add(blob.pk)
+
+            try:
+                with job.image.image.open("rb") as f:
+                    data = f.read()
+            except (OSError, ValueError) as exc:
+                self.fail(job, exc)
+                continue
+            # Already-compressed images only need their renditions
+            futures.append((job, pool.submit(
+                encode_variants, data, full=not job.image.processed,
+            )))
+
+        for job, future in futures:
+            try:
+                owned = apply_variants(job.image, future.result(), job=job)
+            except Exception as exc:
+                self.fail(job, exc)
+                continue
+
+            if owned:
+                self.done(job)
+            else:
+                self.stderr.write(f"Image {job.image_id}: job was requeued meanwhile, result dropped")
+
+        for job in followers:
+            job.image.refresh_from_db(fields=["processed"])
+            if job.image.processed:
+                self.done(job)
+            else:
+                self.fail(job, RuntimeError("duplicate upload was not processed"))
+
+    def mine(self, job):
+        """The job, as long as it still carries this worker's claim."""
+        return ImageJob.objects.filter(
+            pk=job.pk, status=ImageJob.RUNNING, worker=job.worker, attempts=job.attempts,
+        )
+
+    def done(self, job):
+        self.mine(job).update(status=ImageJob.DONE, error="", finished_at=timezone.now())
+        self.stdout.write(f"Processed image {job.image_id}")
+
+    def fail(self, job, exc):
+        error = f"{type(exc).__name__}: {exc}"
+        self.mine(job).update(
+            status=ImageJob.FAILED if job.attempts >= MAX_ATTEMPTS else ImageJob.PENDING,
+            error=error,
+            worker="",
+        )
+        self.stderr.write(f"Image {job.image_id} failed (attempt {job.attempts}): {error}")
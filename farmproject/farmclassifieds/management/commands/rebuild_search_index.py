@@ -0,0 +1,19 @@
+# farmclassifieds/management/commands/rebuild_search_index.py
+
+from django.core.management.base import BaseCommand
+
+from farmclassifieds import search
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuilds the keyword search index from AdPost. Needed after bulk "
+        "imports (bulk_create / queryset.update skip the sync signals)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default="default")
+
+    def handle(self, *args, **options):
+        count = search.rebuild_index(using=options["database"])
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} ads."))
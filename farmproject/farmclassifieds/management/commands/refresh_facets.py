@@ -0,0 +1,16 @@
+# farmclassifieds/management/commands/refresh_facets.py
+
+from django.core.management.base import BaseCommand
+
+from farmclassifieds import facets
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes the district/category facet counts. Run from cron so "
+        "ads that expire by time drop out of the counts."
+    )
+
+    def handle(self, *args, **options):
+        pairs = facets.refresh()
+        self.stdout.write(self.style.SUCCESS(f"Refreshed {pairs} district/category facets."))
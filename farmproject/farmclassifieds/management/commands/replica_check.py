@@ -0,0 +1,211 @@
+# farmclassifieds/management/commands/replica_check.py
+
+import sqlite3
+from contextlib import contextmanager
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, router
+from django.test import Client
+from django.urls import reverse
+
+from farmclassifieds import moderation, routers
+from farmclassifieds.models import AdPost, ReplicaHeartbeat, User
+
+
+CHECK_SELLER = "replica_check_seller"
+CHECK_TITLE = "Replica check listing"
+ALIAS = "replica_check"
+
+
+class Command(BaseCommand):
+    help = (
+        "End-to-end check of the read-replica router on SQLite: copies the "
+        "primary database file to a second file that stands in for a "
+        "replica, then drives requests through the test client to show "
+        "public reads going to the replica, read-your-writes pinning after "
+        "a POST, and fallback to the primary when the replica lags."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--replica", help="Replica file (default: <primary>.replica).")
+        parser.add_argument("--keep", action="store_true", help="Keep the replica file afterwards.")
+
+    def handle(self, *args, **options):
+        primary = connections[DEFAULT_DB_ALIAS]
+        if primary.vendor != "sqlite":
+            raise CommandError("This check copies SQLite files; the default database isn't SQLite.")
+
+        path = Path(options["replica"] or f"{primary.settings_dict['NAME']}.replica")
+        self.router = next(
+            (r for r in router.routers if isinstance(r, routers.ReplicaRouter)), None
+        )
+        if self.router is None:
+            raise CommandError("Add farmclassifieds.routers.ReplicaRouter to DATABASE_ROUTERS.")
+
+        # Register the second file as a replica for this process only
+        saved_alias = connections.settings.get(ALIAS)
+        connections.settings[ALIAS] = {**connections.settings[DEFAULT_DB_ALIAS], "NAME": str(path)}
+        saved_replicas, self.router.replicas = self.router.replicas, [ALIAS]
+        self.failures = 0
+        self.host = next((h for h in settings.ALLOWED_HOSTS if h and h[0] not in "*."), "localhost")
+
+        try:
+            self.run_checks(path)
+        finally:
+            self.router.replicas = saved_replicas
+            moderation.reject(AdPost.objects.filter(created_by__username=CHECK_SELLER, title=CHECK_TITLE))
+            connections[ALIAS].close()
+            del connections[ALIAS]
+            if saved_alias is None:
+                del connections.settings[ALIAS]
+            else:
+                connections.settings[ALIAS] = saved_alias
+            if not options["keep"]:
+                path.unlink(missing_ok=True)
+
+        if self.failures:
+            raise CommandError(f"{self.failures} check(s) failed.")
+        self.stdout.write(self.style.SUCCESS("All replica routing checks passed."))
+
+    # -----------------------
+    # HELPERS
+    # -----------------------
+    def replicate(self, path):
+        """
+        'Replication': a fresh heartbeat (what replica_heartbeat writes),
+        then a consistent snapshot of the primary via SQLite's backup API.
+        """
+        routers.beat()
+        connections[ALIAS].close()
+        primary = connections[DEFAULT_DB_ALIAS]
+        primary.ensure_connection()
+        target = sqlite3.connect(path)
+        try:
+            primary.connection.backup(target)
+        finally:
+            target.close()
+        routers.health.forget()
+
+    @contextmanager
+    def capture(self):
+        """Which alias each AdPost query ran on."""
+        seen = []
+
+        def recorder(alias):
+            def wrapper(execute, sql, params, many, context):
+                if "farmclassifieds_adpost" in sql:
+                    seen.append(alias)
+                return execute(sql, params, many, context)
+            return wrapper
+
+        with connections[DEFAULT_DB_ALIAS].execute_wrapper(recorder(DEFAULT_DB_ALIAS)):
+            with connections[ALIAS].execute_wrapper(recorder(ALIAS)):
+                yield seen
+
+    def _expect(self, label, ok, detail=""):
+        if ok:
+            self.stdout.write(f"  OK    {label}")
+        else:
+            self.failures += 1
+            self.stdout.write(self.style.ERROR(f"  FAIL  {label} {detail}".rstrip()))
+
+    def get(self, client, url):
+        with self.capture() as seen:
+            response = client.get(url)
+        return response, set(seen)
+
+    # -----------------------
+    # CHECKS
+    # -----------------------
+    def run_checks(self, path):
+        self.replicate(path)
+        self.stdout.write(f"Primary: {connections[DEFAULT_DB_ALIAS].settings_dict['NAME']}")
+        self.stdout.write(f"Replica: {path}")
+
+        anonymous = Client(HTTP_HOST=self.host)
+        response, seen = self.get(anonymous, reverse("post_list"))
+        self._expect("public listing reads from the replica", response.status_code == 200 and seen == {ALIAS}, seen)
+
+        seller, _ = User.objects.get_or_create(
+            username=CHECK_SELLER,
+            defaults={"phone_number": "0000000001", "is_verified_seller": True},
+        )
+        seller.ad_post_limit = max(seller.ad_post_limit, 1000)
+        seller.save(update_fields=["ad_post_limit"])
+        client = Client(HTTP_HOST=self.host)
+        client.force_login(seller)
+
+        with self.capture() as seen:
+            response = client.post(reverse("post_create"), {
+                "title": CHECK_TITLE,
+                "contents": "Created by replica_check.",
+                "category": "goat",
+                "phone_number": "9000000000",
+                "postcode": "686001",
+                "district": "Kottayam",
+                "price": "1000",
+            })
+        post = AdPost.objects.filter(created_by=seller, title=CHECK_TITLE).order_by("-id").first()
+        self._expect("post_create writes to the primary", post is not None and ALIAS not in seen, seen)
+        self._expect("the write response pins the browser", routers.PIN_COOKIE in response.cookies)
+        if post is None:
+            return
+        detail = reverse("post_detail", args=[post.pk])
+
+        response, seen = self.get(client, detail)
+        self._expect("the writer reads their new ad from the primary", response.status_code == 200 and ALIAS not in seen, seen)
+
+        response, seen = self.get(anonymous, detail)
+        self._expect(
+            "other visitors read the (stale) replica, which lacks it",
+            response.status_code == 404 and seen == {ALIAS},
+            f"status={response.status_code} {seen}",
+        )
+
+        # Simulate replication falling behind: the replica's heartbeat is old
+        now = routers.beat()
+        ReplicaHeartbeat.objects.using(ALIAS).update_or_create(
+            pk=1, defaults={"beat_at": now - timedelta(seconds=routers.REPLICA_MAX_LAG + 1)},
+        )
+        routers.health.forget()
+        response, seen = self.get(anonymous, detail)
+        self._expect(
+            f"a replica more than {routers.REPLICA_MAX_LAG}s behind is skipped",
+            response.status_code == 200 and ALIAS not in seen,
+            f"status={response.status_code} {seen}",
+        )
+
+        # Caught up again
+        self.replicate(path)
+        response, seen = self.get(anonymous, detail)
+        self._expect(
+            "once caught up, the replica serves the new ad",
+            response.status_code == 200 and seen == {ALIAS},
+            f"status={response.status_code} {seen}",
+        )
+
+        # The heartbeat writer stopped: primary and replica beats are both
+        # old and equal, which says nothing about the lag
+        stale = now - timedelta(seconds=routers.REPLICA_HEARTBEAT_STALE + 1)
+        routers.beat(stale)
+        ReplicaHeartbeat.objects.using(ALIAS).update(beat_at=stale)
+        routers.health.forget()
+        response, seen = self.get(anonymous, reverse("post_list"))
+        self._expect(
+            "a stale primary heartbeat keeps reads on the primary",
+            response.status_code == 200 and ALIAS not in seen,
+            f"status={response.status_code} {seen}",
+        )
+
+        connections[ALIAS].close()
+        path.unlink()
+        routers.health.forget()
+        response, seen = self.get(anonymous, reverse("post_list"))
+        self._expect(
+            "an unreachable replica falls back to the primary",
+            response.status_code == 200 and ALIAS not in seen,
+            f"status={response.status_code} {seen}",
+        )
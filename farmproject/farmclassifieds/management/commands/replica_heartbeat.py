@@ -0,0 +1,36 @@
+# farmclassifieds/management/commands/replica_heartbeat.py
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, close_old_connections
+
+from farmclassifieds import routers
+
+
+class Command(BaseCommand):
+    help = (
+        "Writes the primary's replication heartbeat every "
+        "REPLICA_HEARTBEAT_INTERVAL seconds; replicas are measured against "
+        "it. Run it under a supervisor wherever DATABASE_REPLICAS is set, "
+        "or with --once to write a single beat."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--interval", type=float, default=routers.REPLICA_HEARTBEAT_INTERVAL)
+        parser.add_argument("--once", action="store_true", help="Write one beat, then exit.")
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            try:
+                routers.beat()
+            except DatabaseError as exc:
+                if options["once"]:
+                    raise CommandError(f"Heartbeat failed: {exc}")
+                # Replicas are skipped once the beat goes stale; keep trying
+                self.stderr.write(f"Heartbeat failed: {exc}")
+
+            if options["once"]:
+                break
+            time.sleep(options["interval"])
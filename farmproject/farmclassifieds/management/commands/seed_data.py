@@ -0,0 +1,237 @@
+# farmclassifieds/management/commands/seed_data.py
+
+import math
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from PIL import Image
+
+from farmclassifieds import blobstore, facets, search
+from farmclassifieds.models import (
+    RENEWAL_DAYS, AdImage, AdPost, ImageBlob, PostcodeCentroid, User,
+)
+
+
+# district -> (relative share of ads, postcode prefixes)
+DISTRICTS = {
+    "Thiruvananthapuram": (10, ("695",)),
+    "Kollam": (8, ("690", "691")),
+    "Pathanamthitta": (4, ("689",)),
+    "Alappuzha": (7, ("688", "690")),
+    "Kottayam": (7, ("686",)),
+    "Idukki": (5, ("685",)),
+    "Ernakulam": (10, ("682", "683")),
+    "Thrissur": (10, ("680",)),
+    "Palakkad": (9, ("678",)),
+    "Malappuram": (12, ("676", "679")),
+    "Kozhikode": (9, ("673",)),
+    "Wayanad": (3, ("673",)),
+    "Kannur": (7, ("670",)),
+    "Kasaragod": (4, ("671",)),
+}
+
+# category -> (relative share, median price in rupees, things to sell)
+CATEGORIES = {
+    "fish": (14, 250, ("Tilapia fingerlings", "Rohu seed", "Karimeen", "Pearl spot", "Koi carp")),
+    "chicken": (16, 450, ("Kadaknath chicks", "Gramasree hens", "BV380 layers", "Country chicken")),
+    "duck": (6, 600, ("Chara ducks", "Chemballi ducklings", "Muscovy ducks")),
+    "other_birds": (4, 1500, ("Japanese quail", "Turkey poults", "Guinea fowl", "Love birds")),
+    "cow": (10, 55000, ("HF cow", "Jersey cross", "Vechur cow", "Gir heifer")),
+    "goat": (12, 12000, ("Malabari goat", "Attappady black", "Boer cross kid", "Jamunapari")),
+    "buffalo": (3, 60000, ("Murrah buffalo", "Surti buffalo")),
+    "agri_produce": (10, 80, ("Nendran banana", "Tapioca", "Coconut", "Pepper", "Rubber sheets")),
+    "seeds": (6, 150, ("Vegetable seeds", "Coconut seedlings", "Pepper cuttings", "Paddy seed")),
+    "dogs": (5, 15000, ("Labrador puppies", "Rajapalayam pups", "German Shepherd", "Beagle")),
+    "cats": (2, 6000, ("Persian kittens", "Siamese cat")),
+    "equipment": (5, 8000, ("Brush cutter", "Milking machine", "Incubator", "Sprayer", "Pump set")),
+    "other": (2, 2000, ("Manure", "Cattle feed", "Aquarium", "Fencing net")),
+}
+
+ADJECTIVES = ("Healthy", "Vaccinated", "Farm-raised", "Good quality", "Urgent sale", "Organic", "Young")
+
+STUB_COLOURS = (
+    (120, 90, 60), (200, 180, 90), (60, 120, 60), (90, 140, 200), (230, 230, 220),
+    (40, 40, 40), (180, 80, 60), (150, 170, 90), (210, 150, 120), (100, 100, 160),
+)
+
+
+@contextmanager
+def explicit_timestamps():
+    """Let bulk_create keep our created_at / modified_at instead of now()."""
+    fields = [AdPost._meta.get_field("created_at"), AdPost._meta.get_field("modified_at")]
+    saved = [(f.auto_now, f.auto_now_add) for f in fields]
+    for f in fields:
+        f.auto_now = f.auto_now_add = False
+    try:
+        yield
+    finally:
+        for f, (auto_now, auto_now_add) in zip(fields, saved):
+            f.auto_now, f.auto_now_add = auto_now, auto_now_add
+
+
+class Command(BaseCommand):
+    help = (
+        "Generates synthetic sellers, ads and image stubs with Kerala-like "
+        "district, category and price distributions, for load testing. "
+        "Uses bulk_create in batches; rebuilds the search index and facets "
+        "at the end. Never run against production data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--ads", type=int, default=100_000)
+        parser.add_argument("--max-images", type=int, default=3, help="0..N image stubs per ad.")
+        parser.add_argument("--batch", type=int, default=10_000)
+        parser.add_argument("--days", type=int, default=120, help="Spread created_at over this many days.")
+        parser.add_argument("--seed", type=int, help="Random seed, for repeatable data sets.")
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        started = time.perf_counter()
+
+        users = self.create_users(options["users"], rng)
+        blobs = self.create_stub_blobs() if options["max_images"] else []
+        centroids = dict(
+            (pc, (lat, lon))
+            for pc, lat, lon in PostcodeCentroid.objects.values_list("postcode", "latitude", "longitude")
+        )
+
+        created = images = 0
+        with explicit_timestamps():
+            while created < options["ads"]:
+                size = min(options["batch"], options["ads"] - created)
+                posts = self.make_posts(size, users, centroids, rng, options["days"])
+                with transaction.atomic():
+                    AdPost.objects.bulk_create(posts)
+                    images += self.create_images(posts, blobs, rng, options["max_images"])
+                created += size
+                rate = created / (time.perf_counter() - started)
+                self.stdout.write(f"{created} ads, {images} images ({rate:.0f} ads/sec)")
+
+        if blobs:
+            # Reference counts for the shared stubs
+            ImageBlob.objects.filter(pk__in=[b.pk for b in blobs]).update(refcount=Coalesce(Subquery(
+                AdImage.objects.filter(blob=OuterRef("pk"))
+                .order_by().values("blob").annotate(n=Count("id")).values("n")
+            ), 0))
+
+        self.stdout.write("Rebuilding search index and facets...")
+        search.rebuild_index()
+        facets.refresh()
+
+        seconds = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {len(users)} users, {created} ads and {images} images in {seconds:.1f}s."
+        ))
+
+    # -----------------------
+    # USERS
+    # -----------------------
+    def create_users(self, count, rng):
+        start = User.objects.filter(username__startswith="seed_").count()
+        password = make_password(None)  # unusable; seed accounts can't log in
+        users = [
+            User(
+                username=f"seed_{n}",
+                phone_number=f"5{n:09d}",
+                password=password,
+                ad_post_limit=rng.choice((3, 3, 3, 10, 50, 500)),
+                is_verified_seller=rng.random() < 0.3,
+            )
+            for n in range(start, start + count)
+        ]
+        User.objects.bulk_create(users, batch_size=5000)
+        return list(User.objects.filter(username__startswith="seed_").values_list("pk", flat=True))
+
+    # -----------------------
+    # IMAGE STUBS
+    # -----------------------
+    def create_stub_blobs(self):
+        """A few small real JPEGs shared by every seeded ad (content addressed)."""
+        blobs = []
+        for colour in STUB_COLOURS:
+            out = BytesIO()
+            Image.new("RGB", (640, 480), colour).save(out, format="JPEG", quality=70)
+            data = out.getvalue()
+            digest = blobstore.file_digest(ContentFile(data))
+            name = blobstore.put(blobstore.jpg_name(digest), ContentFile(data))
+            blob, _ = ImageBlob.objects.get_or_create(digest=digest, defaults={
+                "raw": name, "image": name, "size": len(data),
+                "width": 640, "height": 480, "renditions": [], "processed": True,
+            })
+            blobs.append(blob)
+        return blobs
+
+    def create_images(self, posts, blobs, rng, max_images):
+        if not blobs:
+            return 0
+        rows = []
+        for post in posts:
+            for blob in rng.sample(blobs, rng.randint(0, max_images)):
+                rows.append(blobstore.copy_blob(AdImage(post_id=post.pk), blob))
+        AdImage.objects.bulk_create(rows)
+        return len(rows)
+
+    # -----------------------
+    # ADS
+    # -----------------------
+    def make_posts(self, count, users, centroids, rng, days):
+        now = timezone.now()
+        districts = list(DISTRICTS)
+        district_weights = [DISTRICTS[d][0] for d in districts]
+        categories = list(CATEGORIES)
+        category_weights = [CATEGORIES[c][0] for c in categories]
+
+        posts = []
+        for district, category in zip(
+            rng.choices(districts, district_weights, k=count),
+            rng.choices(categories, category_weights, k=count),
+        ):
+            _, median, items = CATEGORIES[category]
+            item = rng.choice(items)
+            postcode = rng.choice(DISTRICTS[district][1]) + f"{rng.randint(1, 599):03d}"
+            lat, lon = centroids.get(postcode, (None, None))
+
+            # Prices are roughly log-normal around the category median
+            price = None
+            if rng.random() > 0.1:
+                price = Decimal(max(10, round(median * math.exp(rng.gauss(0, 0.6)), -1)))
+
+            created_at = now - timedelta(seconds=rng.randint(0, days * 86400))
+            expires_at = created_at + timedelta(days=RENEWAL_DAYS)
+
+            posts.append(AdPost(
+                title=f"{rng.choice(ADJECTIVES)} {item}",
+                contents=(
+                    f"{item} available in {district}. "
+                    f"{rng.choice(ADJECTIVES)}, ready for sale. Call for details."
+                ),
+                category=category,
+                created_by_id=rng.choice(users) if users else None,
+                phone_number=f"9{rng.randint(0, 999_999_999):09d}",
+                postcode=postcode,
+                postcode_digits=postcode,
+                district=district,
+                latitude=lat,
+                longitude=lon,
+                price=price,
+                view_count=int(rng.expovariate(1 / 40)),
+                admin_verified=rng.random() < 0.85,
+                public_flagged=rng.random() < 0.01,
+                created_at=created_at,
+                modified_at=created_at,
+                expires_at=expires_at,
+                is_expired=expires_at <= now,
+            ))
+        return posts
@@ -0,0 +1,211 @@
+# farmclassifieds/management/commands/sqlite_stress.py
+
+import random
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from farmclassifieds.models import AdPost
+
+
+DISTRICTS = ("Kottayam", "Ernakulam", "Thrissur", "Palakkad", "Kannur")
+
+
+def _p95_ms(latencies):
+    if not latencies:
+        return None
+    latencies = sorted(latencies)
+    return round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 1)
+
+
+def _new_post(now, n):
+    return AdPost(
+        title=f"Stress listing {n}",
+        contents="Created by sqlite_stress.",
+        category="goat",
+        phone_number="9000000000",
+        postcode="686001",
+        postcode_digits="686001",
+        district=random.choice(DISTRICTS),
+        admin_verified=True,
+        expires_at=now + timedelta(days=60),
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Concurrency stress test for the SQLite connection profile. Builds "
+        "two scratch databases, one with stock Django SQLite settings "
+        "(before) and one with this project's DATABASES['default'] settings "
+        "(after: OPTIONS timeout, transaction_mode, init_command pragmas). Against each it runs writer threads "
+        "(posting, view-count flushes, read-then-write moderation) and "
+        "reader threads (listing pages), "
+        "then prints throughput, p95 latency and 'database is locked' errors."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seconds", type=float, default=5.0, help="Run time per profile.")
+        parser.add_argument("--writers", type=int, default=4)
+        parser.add_argument("--readers", type=int, default=8)
+        parser.add_argument("--rows", type=int, default=5000, help="Ads pre-loaded for the readers.")
+        parser.add_argument("--dir", help="Where to put the scratch databases (default: a temp dir).")
+
+    def handle(self, *args, **options):
+        scratch = Path(options["dir"] or tempfile.mkdtemp(prefix="sqlite_stress_"))
+        scratch.mkdir(parents=True, exist_ok=True)
+
+        profiles = {
+            # Stock: what Django does with just ENGINE and NAME
+            "before": {"ENGINE": "django.db.backends.sqlite3"},
+            # This project's settings for the default database
+            "after": dict(settings.DATABASES["default"]),
+        }
+
+        results = {}
+        for label, config in profiles.items():
+            alias = f"stress_{label}"
+            path = scratch / f"{alias}.sqlite3"
+            for leftover in scratch.glob(f"{alias}.sqlite3*"):
+                leftover.unlink()
+
+            connections.settings[alias] = connections.configure_settings({
+                "default": connections.settings["default"],
+                alias: {**config, "NAME": str(path)},
+            })[alias]
+
+            self.stderr.write(f"{label}: preparing {path}...")
+            self.prepare(alias, options["rows"])
+            results[label] = self.run(alias, options)
+            results[label]["journal_mode"] = self.journal_mode(alias)
+            results[label]["profile"] = "settings" if label == "after" else "stock"
+
+            connections[alias].close()
+            for leftover in scratch.glob(f"{alias}.sqlite3*"):
+                leftover.unlink()
+
+        if not options["dir"]:
+            scratch.rmdir()
+        self.report(results, options)
+
+    # -----------------------
+    # SETUP
+    # -----------------------
+    def prepare(self, alias, rows):
+        call_command("migrate", database=alias, verbosity=0)
+        now = timezone.now()
+        AdPost.objects.using(alias).bulk_create(
+            [_new_post(now, n) for n in range(rows)], batch_size=1000,
+        )
+        self.max_id = rows
+
+    def journal_mode(self, alias):
+        with connections[alias].cursor() as cursor:
+            cursor.execute("PRAGMA journal_mode")
+            return cursor.fetchone()[0]
+
+    # -----------------------
+    # WORKLOAD
+    # -----------------------
+    def write_once(self, alias, n):
+        posts = AdPost.objects.using(alias)
+        kind = n % 3
+        if kind == 0:
+            # A seller posting an ad
+            with transaction.atomic(using=alias):
+                posts.bulk_create([_new_post(timezone.now(), n)])
+        elif kind == 1:
+            # A view-count flush: one UPDATE over a batch of ads
+            ids = random.sample(range(1, self.max_id + 1), 50)
+            with transaction.atomic(using=alias):
+                posts.filter(pk__in=ids).update(view_count=F("view_count") + 1)
+        else:
+            # Moderation: read a selection, then write it, in one transaction.
+            # Deferred, this read lock must be upgraded to a write lock,
+            # which SQLite refuses ("locked") rather than waits for.
+            start = random.randint(1, self.max_id)
+            with transaction.atomic(using=alias):
+                ids = list(posts.filter(pk__gte=start).values_list("pk", flat=True)[:20])
+                posts.filter(pk__in=ids).update(modified_at=timezone.now())
+
+    def read_once(self, alias, n):
+        posts = AdPost.objects.using(alias).live()
+        if n % 2:
+            list(posts.order_by("-created_at", "-id").values_list("id", "title")[:20])
+        else:
+            list(posts.values("district").annotate(n=Count("id")))
+
+    def worker(self, alias, op, stop, out):
+        latencies, errors, n = [], 0, 0
+        try:
+            while not stop.is_set():
+                n += 1
+                started = time.perf_counter()
+                try:
+                    op(alias, n)
+                    latencies.append(time.perf_counter() - started)
+                except OperationalError:
+                    errors += 1  # "database is locked"
+                # End of a "request": what request_finished does
+                connections[alias].close_if_unusable_or_obsolete()
+        finally:
+            connections[alias].close()
+            out.append((latencies, errors))
+
+    def run(self, alias, options):
+        stop = threading.Event()
+        writes, reads = [], []
+        threads = [
+            threading.Thread(target=self.worker, args=(alias, self.write_once, stop, writes))
+            for _ in range(options["writers"])
+        ] + [
+            threading.Thread(target=self.worker, args=(alias, self.read_once, stop, reads))
+            for _ in range(options["readers"])
+        ]
+
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        time.sleep(options["seconds"])
+        stop.set()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - started
+
+        def summary(samples):
+            latencies = [x for lat, _ in samples for x in lat]
+            return {
+                "ok": len(latencies),
+                "per_sec": round(len(latencies) / elapsed, 1),
+                "p95_ms": _p95_ms(latencies),
+                "locked": sum(errors for _, errors in samples),
+            }
+
+        return {"writes": summary(writes), "reads": summary(reads)}
+
+    # -----------------------
+    # REPORT
+    # -----------------------
+    def report(self, results, options):
+        self.stdout.write(
+            f"\n{options['writers']} writers + {options['readers']} readers, "
+            f"{options['seconds']:g}s per profile\n"
+        )
+        header = f"{'':8} {'profile':11} {'journal':8} {'writes/s':>9} {'w p95 ms':>9} {'w locked':>9} " \
+                 f"{'reads/s':>9} {'r p95 ms':>9} {'r locked':>9}"
+        self.stdout.write(header)
+        self.stdout.write("-" * len(header))
+        for label, r in results.items():
+            w, rd = r["writes"], r["reads"]
+            self.stdout.write(
+                f"{label:8} {r['profile']:11} {r['journal_mode']:8} {w['per_sec']:>9} {str(w['p95_ms']):>9} "
+                f"{w['locked']:>9} {rd['per_sec']:>9} {str(rd['p95_ms']):>9} {rd['locked']:>9}"
+            )
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('farmclassifieds', '0007_user_is_verified_seller_alter_adpost_price'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='adpost',
+            name='price',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='adpost',
+            index=models.Index(condition=models.Q(('admin_verified', True)), fields=['-created_at', '-id'], name='adpost_live_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='adpost',
+            index=models.Index(condition=models.Q(('admin_verified', True)), fields=['price', 'id'], name='adpost_live_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='adpost',
+            index=models.Index(condition=models.Q(('admin_verified', True)), fields=['district', 'category', '-created_at', '-id'], name='adpost_live_dist_cat_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='adpost',
+            index=models.Index(condition=models.Q(('admin_verified', True)), fields=['category', '-created_at'], name='adpost_live_cat_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='adpost',
+            index=models.Index(condition=models.Q(('admin_verified', True)), fields=['district', 'price'], name='adpost_live_dist_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='adpost',
+            index=models.Index(condition=models.Q(('admin_verified', True)), fields=['expires_at'], name='adpost_live_expires_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='adpost',
+            index=models.Index(condition=models.Q(('admin_verified', False)), fields=['created_at'], name='adpost_pending_idx'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+from django.db import migrations
+
+# The DDL and the initial fill are inlined (not imported from search.py)
+# so later changes to the application code can't change this migration.
+
+FTS_TABLE = "farmclassifieds_adpost_fts"
+
+
+def forwards(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+
+    if vendor == "sqlite":
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+            "USING fts5(title, contents, tokenize='porter unicode61')"
+        )
+        schema_editor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, title, contents) "
+            "SELECT id, title, contents FROM farmclassifieds_adpost"
+        )
+    elif vendor == "postgresql":
+        schema_editor.execute(
+            f"CREATE TABLE IF NOT EXISTS {FTS_TABLE} ("
+            " post_id bigint PRIMARY KEY"
+            "   REFERENCES farmclassifieds_adpost (id) ON DELETE CASCADE,"
+            " document tsvector NOT NULL)"
+        )
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {FTS_TABLE}_gin "
+            f"ON {FTS_TABLE} USING GIN (document)"
+        )
+        schema_editor.execute(
+            f"INSERT INTO {FTS_TABLE} (post_id, document) "
+            "SELECT id,"
+            " setweight(to_tsvector('english', title), 'A') ||"
+            " setweight(to_tsvector('english', contents), 'B')"
+            " FROM farmclassifieds_adpost"
+        )
+
+
+def backwards(apps, schema_editor):
+    if schema_editor.connection.vendor in ("sqlite", "postgresql"):
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('farmclassifieds', '0008_adpost_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
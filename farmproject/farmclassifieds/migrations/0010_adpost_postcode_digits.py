@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:49
+
+import re
+
+from django.db import migrations, models
+
+
+def backfill_postcode_digits(apps, schema_editor):
+    AdPost = apps.get_model('farmclassifieds', 'AdPost')
+    db_alias = schema_editor.connection.alias
+    batch = []
+
+    for post in AdPost.objects.using(db_alias).only('id', 'postcode').iterator(chunk_size=2000):
+        post.postcode_digits = re.sub(r'\D', '', post.postcode or '')
+        batch.append(post)
+        if len(batch) >= 2000:
+            AdPost.objects.using(db_alias).bulk_update(batch, ['postcode_digits'])
+            batch = []
+
+    if batch:
+        AdPost.objects.using(db_alias).bulk_update(batch, ['postcode_digits'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('farmclassifieds', '0009_adpost_fts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='adpost',
+            name='postcode_digits',
+            field=models.CharField(blank=True, default='', editable=False, max_length=20),
+        ),
+        migrations.RunPython(backfill_postcode_digits, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='adpost',
+            index=models.Index(condition=models.Q(('admin_verified', True)), fields=['postcode_digits', '-created_at'], name='adpost_live_postcode_idx'),
+        ),
+    ]
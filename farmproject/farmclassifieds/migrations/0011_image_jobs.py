@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def mark_existing_processed(apps, schema_editor):
+    # Images uploaded before the worker existed were encoded inline
+    AdImage = apps.get_model('farmclassifieds', 'AdImage')
+    db_alias = schema_editor.connection.alias
+    AdImage.objects.using(db_alias).update(processed=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('farmclassifieds', '0010_adpost_postcode_digits'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='adimage',
+            name='processed',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(mark_existing_processed, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name='ImageJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('worker', models.CharField(blank=True, max_length=64)),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('image', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='jobs', to='farmclassifieds.adimage')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'id'], name='imagejob_status_idx')],
+            },
+        ),
+    ]
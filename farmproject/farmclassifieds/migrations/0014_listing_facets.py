@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:00
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.utils import timezone
+
+
+def populate_facets(apps, schema_editor):
+    AdPost = apps.get_model('farmclassifieds', 'AdPost')
+    ListingFacet = apps.get_model('farmclassifieds', 'ListingFacet')
+    db_alias = schema_editor.connection.alias
+
+    rows = (
+        AdPost.objects.using(db_alias)
+        .filter(admin_verified=True, expires_at__gt=timezone.now())
+        .values('district', 'category')
+        .annotate(n=Count('id'))
+        .order_by()
+    )
+    ListingFacet.objects.using(db_alias).bulk_create([
+        ListingFacet(district=r['district'], category=r['category'], live_count=r['n'])
+        for r in rows
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('farmclassifieds', '0013_image_blobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ListingFacet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('district', models.CharField(max_length=100)),
+                ('category', models.CharField(choices=[('fish', 'Fish'), ('chicken', 'Chicken'), ('duck', 'Duck'), ('other_birds', 'Other Birds'), ('cow', 'Cow'), ('goat', 'Goat'), ('buffalo', 'Buffalo'), ('agri_produce', 'Agri Produce'), ('seeds', 'Seeds'), ('dogs', 'Dogs'), ('cats', 'Cats'), ('equipment', 'Equipment'), ('other', 'Other')], max_length=50)),
+                ('live_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('district', 'category'), name='listingfacet_pair_uniq')],
+            },
+        ),
+        migrations.RunPython(populate_facets, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:01
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def sync_is_expired(apps, schema_editor):
+    # is_expired was only set on save until now; live() reads it from here on
+    AdPost = apps.get_model('farmclassifieds', 'AdPost')
+    db_alias = schema_editor.connection.alias
+    now = timezone.now()
+    AdPost.objects.using(db_alias).filter(expires_at__lte=now).update(is_expired=True)
+    AdPost.objects.using(db_alias).filter(expires_at__gt=now).update(is_expired=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('farmclassifieds', '0014_listing_facets'),
+    ]
+
+    operations = [
+        migrations.RunPython(sync_is_expired, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='adpost',
+            name='adpost_live_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='adpost',
+            name='adpost_live_price_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='adpost',
+            name='adpost_live_dist_cat_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='adpost',
+            name='adpost_live_cat_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='adpost',
+            name='adpost_live_dist_price_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='adpost',
+            name='adpost_live_expires_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='adpost',
+            name='adpost_live_postcode_idx',
+        ),
+        migrations.AddIndex(
+            model_name='adpost',
+            index=models.Index(condition=models.Q(('admin_verified', True), ('is_expired', False)), fields=['-created_at', '-id'], name='adpost_live_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='adpost',
+            index=models.Index(condition=models.Q(('admin_verified', True), ('is_expired', False)), fields=['price', 'id'], name='adpost_live_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='adpost',
+            index=models.Index(condition=models.Q(('admin_verified', True), ('is_expired', False)), fields=['district', 'category', '-created_at', '-id'], name='adpost_live_dist_cat_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='adpost',
+            index=models.Index(condition=models.Q(('admin_verified', True), ('is_expired', False)), fields=['category', '-created_at'], name='adpost_live_cat_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='adpost',
+            index=models.Index(condition=models.Q(('admin_verified', True), ('is_expired', False)), fields=['district', 'price'], name='adpost_live_dist_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='adpost',
+            index=models.Index(condition=models.Q(('admin_verified', True), ('is_expired', False)), fields=['postcode_digits', '-created_at'], name='adpost_live_postcode_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='adpost',
+            index=models.Index(condition=models.Q(('is_expired', False)), fields=['expires_at', 'id'], name='adpost_unexpired_idx'),
+        ),
+    ]
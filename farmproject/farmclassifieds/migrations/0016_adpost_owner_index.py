@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('farmclassifieds', '0015_adpost_expiry_sweep'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='adpost',
+            index=models.Index(fields=['created_by', '-created_at', '-id'], name='adpost_owner_created_idx'),
+        ),
+    ]
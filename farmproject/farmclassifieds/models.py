@@ -1,12 +1,12 @@
 from django.conf import settings
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.db.models.functions import Coalesce, Greatest
 from django.utils import timezone
 
-from io import BytesIO
-from django.core.files.base import ContentFile
-from PIL import Image
 import os
+from concurrent.futures import ThreadPoolExecutor
+from django.db import transaction
 from django.utils import timezone
 from datetime import timedelta
 
@@ -38,6 +38,139 @@ class User(AbstractUser):
 
 from datetime import timedelta
 from django.utils import timezone
+import re
+
+from . import geo
+
+
+# Sellers may renew an ad this many times, RENEWAL_DAYS each
+MAX_RENEWALS = 3
+RENEWAL_DAYS = 60
+
+
+def normalize_postcode(value):
+    """'686 012' / '686-012' -> '686012'"""
+    return re.sub(r"\D", "", value or "")
+
+
+class AdPostQuerySet(models.QuerySet):
+    def live(self):
+        """
+        Approved and not yet expired — what the public pages show.
+        is_expired is flipped by `manage.py expire_posts` (run it from cron),
+        so this is a plain indexed equality rather than a now() comparison.
+        """
+        return self.filter(admin_verified=True, is_expired=False)
+
+    def due_to_expire(self, at=None):
+        """Rows whose expires_at has passed but are not flagged yet."""
+        return self.filter(is_expired=False, expires_at__lte=at or timezone.now())
+
+    def with_image_count(self):
+        """image_count as a correlated subquery (only evaluated for the rows returned)."""
+        images = (
+            AdImage.objects.filter(post=models.OuterRef("pk"))
+            .order_by().values("post").annotate(n=models.Count("id")).values("n")
+        )
+        return self.annotate(image_count=Coalesce(models.Subquery(images), 0))
+
+    def for_moderation(self):
+        """
+        Everything the moderation panel prints per row, fetched with the
+        page itself: the seller via a join, image / ad counts as correlated
+        subqueries.
+        """
+        seller_posts = (
+            AdPost.objects.filter(created_by=models.OuterRef("created_by"))
+            .order_by().values("created_by").annotate(n=models.Count("id")).values("n")
+        )
+        return self.select_related("created_by").with_image_count().annotate(
+            seller_post_count=Coalesce(models.Subquery(seller_posts), 0),
+        )
+
+    def for_owner(self, user):
+        """A seller's own ads with renew_left and image_count computed in SQL."""
+        return self.filter(created_by=user).with_image_count().annotate(
+            renew_left=Greatest(MAX_RENEWALS - models.F("renew_count"), 0),
+        )
+
+    def with_status(self, status):
+        """my_posts tabs: active / expired / pending (anything else: all)."""
+        if status == "active":
+            return self.live()
+        if status == "expired":
+            return self.filter(is_expired=True)
+        if status == "pending":
+            return self.filter(admin_verified=False, is_expired=False)
+        return self
+
+    @staticmethod
+    def _extension(days):
+        """UPDATE kwargs that push expires_at out by `days`."""
+        now = timezone.now()
+        period = timedelta(days=days)
+        return {
+            "expires_at": models.F("expires_at") + period,
+            # Same rule as save(): still expired if it lapsed > one period ago
+            "is_expired": models.Case(
+                models.When(expires_at__lte=now - period, then=models.Value(True)),
+                default=models.Value(False),
+            ),
+            "modified_at": now,
+        }
+
+    def renew(self):
+        """
+        Push expires_at out by RENEWAL_DAYS for every row that still has
+        renewals left, in one UPDATE. Returns the number of ads renewed.
+        """
+        return self.filter(renew_count__lt=MAX_RENEWALS).update(
+            renew_count=models.F("renew_count") + 1,
+            **self._extension(RENEWAL_DAYS),
+        )
+
+    def extend(self, days):
+        """Staff extension: no renewal limit, one UPDATE. Returns the count."""
+        return self.update(**self._extension(days))
+
+    def within_radius(self, lat, lon, km):
+        """
+        Ads within `km` of (lat, lon), annotated with `distance` (km).
+        Bounding box first (indexed), exact haversine second.
+        """
+        min_lat, max_lat, min_lon, max_lon = geo.bounding_box(lat, lon, km)
+        return (
+            self.filter(
+                latitude__range=(min_lat, max_lat),
+                longitude__range=(min_lon, max_lon),
+            )
+            .annotate(distance=geo.haversine(lat, lon))
+            .filter(distance__lte=km)
+        )
+
+    def postcode_prefix(self, postcode):
+        """
+        "6860" matches every 6860xx postcode. Written as a range on the
+        digits-only column so it can use an index, unlike icontains.
+        """
+        prefix = normalize_postcode(postcode)
+        if not prefix:
+            return self.none()
+        # Values are digits only, and ":" sorts right after "9"
+        upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        return self.filter(postcode_digits__gte=prefix, postcode_digits__lt=upper)
+
+
+# Rows covered by the public listing indexes
+LIVE = models.Q(admin_verified=True, is_expired=False)
+
+# Fields whose stored values an AdPost remembers (AdPost.stored), so a
+# save can tell what it changed without reading the row again
+TRACKED_FIELDS = frozenset({
+    "district", "category", "admin_verified", "is_expired",  # facet counts
+    "postcode_digits",  # centroid lookup
+})
+
 
 class AdPost(models.Model):
     CATEGORY_CHOICES = [
@@ -73,7 +206,12 @@ class AdPost(models.Model):
     )
 
     postcode = models.CharField(max_length=20)
+    # Digits-only copy of postcode for indexed prefix lookups (set in save)
+    postcode_digits = models.CharField(max_length=20, blank=True, default="", editable=False)
     district = models.CharField(max_length=100)
+    # Centroid of the postcode (PostcodeCentroid), for radius search
+    latitude = models.FloatField(null=True, blank=True, editable=False)
+    longitude = models.FloatField(null=True, blank=True, editable=False)
 
     price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
 
@@ -85,6 +223,77 @@ class AdPost(models.Model):
     renew_count = models.PositiveIntegerField(default=0)
     is_expired = models.BooleanField(default=False)
 
+    objects = AdPostQuerySet.as_manager()
+
+    class Meta:
+        # Partial indexes only hold live ads, so they stay small while the
+        # pending / rejected / expired backlog grows. The public views all
+        # filter on live() and then seek by district / category and order
+        # by created_at or price.
+        indexes = [
+            models.Index(
+                fields=["-created_at", "-id"],
+                condition=LIVE,
+                name="adpost_live_created_idx",
+            ),
+            models.Index(
+                fields=["price", "id"],
+                condition=LIVE,
+                name="adpost_live_price_idx",
+            ),
+            models.Index(
+                fields=["district", "category", "-created_at", "-id"],
+                condition=LIVE,
+                name="adpost_live_dist_cat_idx",
+            ),
+            models.Index(
+                fields=["category", "-created_at"],
+                condition=LIVE,
+                name="adpost_live_cat_created_idx",
+            ),
+            models.Index(
+                fields=["district", "price"],
+                condition=LIVE,
+                name="adpost_live_dist_price_idx",
+            ),
+            models.Index(
+                fields=["postcode_digits", "-created_at"],
+                condition=LIVE,
+                name="adpost_live_postcode_idx",
+            ),
+            # Radius search bounding box
+            models.Index(
+                fields=["latitude", "longitude"],
+                condition=LIVE,
+                name="adpost_live_geo_idx",
+            ),
+            # Expiry sweeper: walks (expires_at, id) over unexpired rows only
+            models.Index(
+                fields=["expires_at", "id"],
+                condition=models.Q(is_expired=False),
+                name="adpost_unexpired_idx",
+            ),
+            # my_posts
+            models.Index(
+                fields=["created_by", "-created_at", "-id"],
+                name="adpost_owner_created_idx",
+            ),
+            # Moderation queue
+            models.Index(
+                fields=["created_at"],
+                condition=models.Q(admin_verified=False),
+                name="adpost_pending_idx",
+            ),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.stored = {
+            name: getattr(instance, name) for name in TRACKED_FIELDS & set(field_names)
+        }
+        return instance
+
     def save(self, *args, **kwargs):
         # Set expiry ONLY on first creation
         if not self.pk and not self.expires_at:
@@ -93,15 +302,74 @@ class AdPost(models.Model):
         # Keep is_expired in sync
         self.is_expired = timezone.now() > self.expires_at
 
+        self.postcode_digits = normalize_postcode(self.postcode)
+        update_fields = kwargs.get("update_fields")
+        postcode_changed = self.postcode_digits != getattr(self, "stored", {}).get("postcode_digits")
+        if postcode_changed and (update_fields is None or "postcode" in update_fields):
+            self.latitude, self.longitude = PostcodeCentroid.locate(self.postcode_digits) or (None, None)
+        if update_fields is not None and "postcode" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "postcode_digits", "latitude", "longitude"}
+
+        # post_save handlers still see the previous values in self.stored
         super().save(*args, **kwargs)
+        self.stored = self.values_after_save(kwargs.get("update_fields"))
+
+    def values_after_save(self, update_fields=None):
+        """The tracked fields as a save with these update_fields leaves the row."""
+        written = TRACKED_FIELDS if update_fields is None else TRACKED_FIELDS & set(update_fields)
+        return {
+            **getattr(self, "stored", {}),
+            # Deferred fields aren't written (and aren't fetched here)
+            **{name: self.__dict__[name] for name in written if name in self.__dict__},
+        }
 
     def __str__(self):
         return self.title
 
 
 # ------------------------------
-#  AD IMAGE (with compression + WebP)
+#  POSTCODE CENTROIDS (see geo.py)
+# ------------------------------
+class PostcodeCentroid(models.Model):
+    # Digits only, like AdPost.postcode_digits
+    postcode = models.CharField(max_length=20, unique=True)
+    latitude = models.FloatField()
+    longitude = models.FloatField()
+
+    def __str__(self):
+        return f"{self.postcode} ({self.latitude:.4f}, {self.longitude:.4f})"
+
+    @classmethod
+    def locate(cls, postcode):
+        """(lat, lon) for a postcode, or None if it isn't in the table."""
+        digits = normalize_postcode(postcode)
+        if not digits:
+            return None
+        return cls.objects.filter(postcode=digits).values_list("latitude", "longitude").first()
+
+
+# ------------------------------
+#  FACET COUNTS (see facets.py)
+# ------------------------------
+class ListingFacet(models.Model):
+    district = models.CharField(max_length=100)
+    category = models.CharField(max_length=50, choices=AdPost.CATEGORY_CHOICES)
+    live_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["district", "category"], name="listingfacet_pair_uniq"),
+        ]
+
+    def __str__(self):
+        return f"{self.district} / {self.category}: {self.live_count}"
+
+
+# ------------------------------
+#  AD IMAGE (compression + WebP done by the image worker)
 # ------------------------------
+# New uploads are content-addressed (see blobstore.py); these two are
+# kept for the existing migrations and for ImageField.save() fallbacks.
 def get_image_upload_path(instance, filename):
     return os.path.join('ad_images', filename)
 
@@ -109,9 +377,105 @@ def get_image_upload_path(instance, filename):
 def get_webp_upload_path(instance, filename):
     return os.path.join('ad_images', 'webp', filename)
 
+
+# ------------------------------
+#  IMAGE BLOB (one per distinct upload, shared by AdImages)
+# ------------------------------
+class ImageBlob(models.Model):
+    digest = models.CharField(max_length=64, unique=True)  # sha256 of the raw upload
+    raw = models.CharField(max_length=255)                  # raw upload until processed
+    size = models.PositiveBigIntegerField(default=0)        # raw upload bytes
+    refcount = models.IntegerField(default=0)
+
+    # Same shape as the AdImage fields; copied onto every AdImage using it
+    image = models.CharField(max_length=255, blank=True)
+    webp_image = models.CharField(max_length=255, blank=True)
+    width = models.PositiveIntegerField(null=True, blank=True)
+    height = models.PositiveIntegerField(null=True, blank=True)
+    renditions = models.JSONField(default=list, blank=True)
+    processed = models.BooleanField(default=False)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.digest[:12]} ({self.refcount} refs)"
+
+    def file_names(self):
+        names = {self.raw, self.image, self.webp_image}
+        for r in self.renditions:
+            names.update(r.get(fmt) for fmt in ("jpg", "webp"))
+        return [n for n in names if n]
+
+
 # ------------------------------
 #  AD IMAGE (with hard limit: max 6 images per post)
 # ------------------------------
+MAX_IMAGES_PER_POST = 6
+
+
+class AdImageQuerySet(models.QuerySet):
+    def ingest(self, post, files):
+        """
+        Attach uploaded files to `post` in one go:
+          1. hash the uploads in parallel and store the raw bytes of any
+             we haven't already processed (identical uploads are free),
+          2. lock the post row, check the image limit ONCE,
+          3. take blob references and bulk_create the AdImage rows, plus
+             ImageJobs for the ones that still need encoding.
+        Raises ValueError (like AdImage.save) if the limit would be passed;
+        raw files no blob ended up using are removed again in that case.
+        """
+        from . import blobstore
+
+        files = list(files)
+        if not files:
+            return []
+
+        workers = min(len(files), MAX_IMAGES_PER_POST)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            digests = list(pool.map(blobstore.file_digest, files))
+
+            known = blobstore.processed_blobs(digests)
+            stored = list(pool.map(
+                lambda f, d: blobstore.store_raw(f, d, known), files, digests,
+            ))
+
+        try:
+            with transaction.atomic():
+                # The UPDATE takes the row lock (and the write lock on
+                # SQLite), so concurrent uploads to the same post queue up
+                # here and each one sees the other's images in the count.
+                AdPost.objects.filter(pk=post.pk).update(modified_at=timezone.now())
+
+                if post.images.count() + len(stored) > MAX_IMAGES_PER_POST:
+                    raise ValueError(
+                        f"A post cannot have more than {MAX_IMAGES_PER_POST} images."
+                    )
+
+                blobs = blobstore.acquire(stored)
+                images = self.bulk_create([
+                    blobstore.copy_blob(self.model(post=post), blobs[digest])
+                    for digest, _name, _size in stored
+                ])
+                if any(img.pk is None for img in images):
+                    # Backends that can't return ids from a bulk insert
+                    images = list(self.filter(post=post, blob__digest__in=digests))
+
+                ImageJob.objects.bulk_create([
+                    ImageJob(image=img) for img in images if not img.processed
+                ])
+        except Exception:
+            in_use = set(
+                ImageBlob.objects.filter(digest__in=digests).values_list("digest", flat=True)
+            )
+            storage = self.model._meta.get_field('image').storage
+            for digest, name, _size in stored:
+                if digest not in in_use:
+                    storage.delete(name)
+            raise
+
+        return images
+
 
 class AdImage(models.Model):
     post = models.ForeignKey(
@@ -127,37 +491,97 @@ class AdImage(models.Model):
         null=True
     )
 
+    # False until the process_images worker has written the compressed
+    # JPEG / WebP variants; templates show the raw upload until then.
+    processed = models.BooleanField(default=False)
+
+    # Filled by the worker: full-size dimensions and the srcset renditions,
+    # [{"w": 320, "h": 240, "jpg": "<name>", "webp": "<name>"}, ...]
+    width = models.PositiveIntegerField(null=True, blank=True)
+    height = models.PositiveIntegerField(null=True, blank=True)
+    renditions = models.JSONField(default=list, blank=True)
+
+    # Content-addressed source; NULL for images uploaded before dedup
+    blob = models.ForeignKey(
+        ImageBlob,
+        on_delete=models.PROTECT,
+        related_name='images',
+        null=True,
+        blank=True
+    )
+
+    objects = AdImageQuerySet.as_manager()
+
     def __str__(self):
         return f"Image for post {self.post_id}"
 
     def save(self, *args, **kwargs):
+        creating = self._state.adding
+
         # Enforce MAX 6 images per post at model-level
-        if self.post.images.count() >= 6:
-            raise ValueError("A post cannot have more than 6 images.")
-
-        raw = kwargs.pop('raw', False)
-
-        if self.image and not raw:
-            img = Image.open(self.image)
-            img = img.convert('RGB')
-
-            # -------- Compressed JPEG ----------
-            jpg_io = BytesIO()
-            img.save(jpg_io, format='JPEG', quality=75, optimize=True)
-            jpg_io.seek(0)
-
-            base_name, _ext = os.path.splitext(self.image.name)
-            jpg_name = base_name + ".jpg"
-            self.image.save(jpg_name, ContentFile(jpg_io.getvalue()), save=False)
-
-            # -------- WebP variant -------------
-            try:
-                webp_io = BytesIO()
-                img.save(webp_io, format='WEBP', quality=70, method=6)
-                webp_io.seek(0)
-                webp_name = base_name + ".webp"
-                self.webp_image.save(webp_name, ContentFile(webp_io.getvalue()), save=False)
-            except OSError:
-                pass
+        if creating and self.post.images.count() >= MAX_IMAGES_PER_POST:
+            raise ValueError(f"A post cannot have more than {MAX_IMAGES_PER_POST} images.")
 
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            if creating and self.blob_id is None and self.image and not self.image._committed:
+                from . import blobstore
+                blobstore.attach(self)
+
+            super().save(*args, **kwargs)
+
+            # Encoding happens off the request path (manage.py process_images)
+            if creating and not self.processed:
+                ImageJob.objects.create(image=self)
+
+
+# ------------------------------
+#  IMAGE JOB QUEUE (DB-backed)
+# ------------------------------
+class ImageJob(models.Model):
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    image = models.ForeignKey(
+        AdImage,
+        on_delete=models.CASCADE,
+        related_name='jobs'
+    )
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+
+    # Set when a worker claims the job; stale claims are retried
+    worker = models.CharField(max_length=64, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "id"], name="imagejob_status_idx"),
+        ]
+
+    def __str__(self):
+        return f"Job {self.pk} ({self.status}) for image {self.image_id}"
+
+
+# ------------------------------
+#  REPLICATION LAG (see routers.py)
+# ------------------------------
+class ReplicaHeartbeat(models.Model):
+    # One row, bumped on the primary; how far a replica's copy trails
+    # the primary's is its replication lag.
+    beat_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"Heartbeat {self.beat_at:%Y-%m-%d %H:%M:%S}"
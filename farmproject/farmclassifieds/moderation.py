@@ -0,0 +1,69 @@
+# farmclassifieds/moderation.py
+
+from collections import Counter
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import blobstore, cards, facets, search, signals
+from .models import AdImage, AdPost
+
+
+# ---------------------------------------------
+# BULK MODERATION
+# ---------------------------------------------
+# Used by the moderation panel (one ad or a whole selection) and by the
+# AdPostAdmin actions. Each call is one transaction with a fixed number
+# of statements, however many ads are selected. Each returns the number
+# of ads affected.
+
+def approve(queryset):
+    with transaction.atomic():
+        ids = list(queryset.values_list("pk", flat=True))
+        with facets.tracking(ids):
+            approved = AdPost.objects.filter(pk__in=ids).update(
+                admin_verified=True,
+                public_flagged=False,  # ✅ clear spam flag when approving
+                modified_at=timezone.now(),
+            )
+    return approved
+
+
+def extend(queryset, months):
+    with transaction.atomic():
+        ids = list(queryset.values_list("pk", flat=True))
+        with facets.tracking(ids):
+            extended = AdPost.objects.filter(pk__in=ids).extend(days=30 * months)
+    return extended
+
+
+def reject(queryset):
+    """
+    Delete the ads and everything hanging off them. The per-row signal
+    handlers are muted; their work is done here in bulk instead:
+    one DELETE per table, one refcount UPDATE for the image blobs,
+    one DELETE on the search index, one facet delta per district / category.
+    Returns (ads deleted, images deleted).
+    """
+    with transaction.atomic(), signals.muted():
+        ids = list(queryset.values_list("pk", flat=True))
+        if not ids:
+            return 0, 0
+
+        blob_refs = Counter(
+            AdImage.objects
+            .filter(post_id__in=ids, blob__isnull=False)
+            .values_list("blob_id", flat=True)
+        )
+
+        with facets.tracking(ids):
+            _, per_model = AdPost.objects.filter(pk__in=ids).delete()
+
+        blobstore.release_many(blob_refs)
+        search.unindex_posts(ids)
+        transaction.on_commit(lambda: cards.invalidate(*ids))
+
+    return (
+        per_model.get(AdPost._meta.label, 0),
+        per_model.get(AdImage._meta.label, 0),
+    )
@@ -0,0 +1,173 @@
+# farmclassifieds/pagination.py
+
+from django.core import signing
+from django.db.models import F, Q
+
+
+# ---------------------------------------------
+# KEYSET (CURSOR) PAGINATION
+# ---------------------------------------------
+# Every page is fetched with "WHERE (key, id) > (last_key, last_id)
+# ORDER BY key, id LIMIT n+1", so page 500 costs the same as page 1.
+# No OFFSET scans and no COUNT(*).
+
+CURSOR_SALT = "farmclassifieds.cursor"
+
+# sort mode -> (field, descending, nullable)
+SORT_KEYS = {
+    "new": ("created_at", True, False),
+    "old": ("created_at", False, False),
+    "price_low": ("price", False, True),
+    "price_high": ("price", True, True),
+}
+
+DEFAULT_SORT = "new"
+
+
+def encode_cursor(sort, value, pk, direction):
+    """Opaque, tamper-proof token for one edge of a page."""
+    payload = {
+        "s": sort,
+        "v": None if value is None else str(value),
+        "id": pk,
+        "d": direction,
+    }
+    return signing.dumps(payload, salt=CURSOR_SALT, compress=True)
+
+
+def decode_cursor(token, sort):
+    """Return (value, pk, direction) or None for a bad / foreign token."""
+    if not token:
+        return None
+
+    try:
+        payload = signing.loads(token, salt=CURSOR_SALT)
+    except signing.BadSignature:
+        return None
+
+    if payload.get("s") != sort or payload.get("d") not in ("next", "prev"):
+        return None
+
+    return payload.get("v"), payload.get("id"), payload["d"]
+
+
+class KeysetPage:
+    def __init__(self, object_list, sort, has_next, has_previous):
+        self.object_list = object_list
+        self.sort = sort
+        self.has_next = has_next
+        self.has_previous = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    def _edge_cursor(self, obj, direction):
+        field = SORT_KEYS[self.sort][0]
+        return encode_cursor(self.sort, getattr(obj, field), obj.pk, direction)
+
+    @property
+    def next_cursor(self):
+        if not self.has_next or not self.object_list:
+            return None
+        return self._edge_cursor(self.object_list[-1], "next")
+
+    @property
+    def previous_cursor(self):
+        if not self.has_previous or not self.object_list:
+            return None
+        return self._edge_cursor(self.object_list[0], "prev")
+
+
+class KeysetPaginator:
+    """
+    Cursor pagination over (sort_key, id).
+
+    Ads without a price always sort last, in both price directions, so
+    the NULL block is one contiguous run at the end of the feed.
+    """
+
+    def __init__(self, queryset, per_page, sort=DEFAULT_SORT):
+        if sort not in SORT_KEYS:
+            sort = DEFAULT_SORT
+        self.queryset = queryset
+        self.per_page = per_page
+        self.sort = sort
+        self.field, self.descending, self.nullable = SORT_KEYS[sort]
+
+    def ordering(self, reverse=False):
+        descending = self.descending != reverse
+        nulls = {"nulls_first": True} if reverse else {"nulls_last": True}
+        key = F(self.field).desc(**nulls) if descending else F(self.field).asc(**nulls)
+        return [key, "-id" if descending else "id"]
+
+    def _seek_forward(self, value, pk):
+        gt = "lt" if self.descending else "gt"
+        f = self.field
+
+        if value is None:
+            # Already inside the trailing NULL block
+            return Q(**{f"{f}__isnull": True, f"id__{gt}": pk})
+
+        q = Q(**{f"{f}__{gt}": value}) | Q(**{f: value, f"id__{gt}": pk})
+        if self.nullable:
+            q |= Q(**{f"{f}__isnull": True})
+        return q
+
+    def _seek_backward(self, value, pk):
+        lt = "gt" if self.descending else "lt"
+        f = self.field
+
+        if value is None:
+            return Q(**{f"{f}__isnull": False}) | Q(**{f"{f}__isnull": True, f"id__{lt}": pk})
+
+        return Q(**{f"{f}__{lt}": value}) | Q(**{f: value, f"id__{lt}": pk})
+
+    def _to_python(self, raw):
+        if raw is None:
+            return None
+        return self.queryset.model._meta.get_field(self.field).to_python(raw)
+
+    def get_page(self, token=None):
+        cursor = decode_cursor(token, self.sort)
+
+        if cursor is None:
+            rows = list(self.queryset.order_by(*self.ordering())[: self.per_page + 1])
+            return KeysetPage(
+                rows[: self.per_page], self.sort,
+                has_next=len(rows) > self.per_page,
+                has_previous=False,
+            )
+
+        raw, pk, direction = cursor
+        value = self._to_python(raw)
+
+        if direction == "next":
+            qs = self.queryset.filter(self._seek_forward(value, pk))
+            rows = list(qs.order_by(*self.ordering())[: self.per_page + 1])
+            return KeysetPage(
+                rows[: self.per_page], self.sort,
+                has_next=len(rows) > self.per_page,
+                has_previous=True,
+            )
+
+        qs = self.queryset.filter(self._seek_backward(value, pk))
+        rows = list(qs.order_by(*self.ordering(reverse=True))[: self.per_page + 1])
+        has_previous = len(rows) > self.per_page
+        rows = rows[: self.per_page]
+        rows.reverse()
+        return KeysetPage(rows, self.sort, has_next=True, has_previous=has_previous)
+
+
+def cursor_querystring(request, cursor, param="cursor"):
+    """Current GET params with the cursor swapped out, for next/prev links."""
+    if not cursor:
+        return ""
+    params = request.GET.copy()
+    params[param] = cursor
+    return params.urlencode()
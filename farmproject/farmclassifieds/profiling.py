@@ -0,0 +1,204 @@
+# farmclassifieds/profiling.py
+
+import cProfile
+import io
+import itertools
+import logging
+import os
+import pstats
+import re
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+# ---------------------------------------------
+# ON-DEMAND / SAMPLED PROFILER
+# ---------------------------------------------
+# ProfilingMiddleware (last in MIDDLEWARE, so it wraps the view and the
+# template rendering done inside it) runs a request under cProfile when
+#   * a staff user adds ?profile=1, or
+#   * it is the 1-in-PROFILE_SAMPLE_RATE request (any user; 0 = off).
+# Each profile is written to PROFILE_DIR as
+#   <stamp>_<url name>_<ms>ms.prof        pstats dump (snakeviz, pstats)
+#   <stamp>_<url name>_<ms>ms.collapsed   folded stacks (flamegraph.pl,
+#                                         speedscope), in microseconds
+# and only the newest PROFILE_KEEP profiles are kept. Staff browse them at
+# moderation/profiles/.
+
+PROFILE_DIR = Path(getattr(settings, "PROFILE_DIR", settings.BASE_DIR / "profiles"))
+PROFILE_SAMPLE_RATE = getattr(settings, "PROFILE_SAMPLE_RATE", 0)
+PROFILE_KEEP = getattr(settings, "PROFILE_KEEP", 50)
+
+PROFILE_NAME = re.compile(r"^(?P<stamp>\d{8}-\d{6}-\d{6})_(?P<view>[\w.-]+)_(?P<ms>\d+)ms$")
+
+_counter = itertools.count(1)
+
+
+# -----------------------
+# COLLAPSED STACKS
+# -----------------------
+def _frame_label(func):
+    filename, line, name = func
+    if filename == "~":
+        return name.replace(";", ":")  # built-ins, e.g. <built-in method time.sleep>
+    return f"{name} ({os.path.basename(filename)}:{line})".replace(";", ":")
+
+
+def collapsed_stacks(stats):
+    """
+    Folded stacks rebuilt from the cProfile call graph. cProfile keeps the
+    inclusive time of each caller -> callee edge, so the first level below
+    every caller is exact; deeper levels share a callee's time out in
+    proportion to the edge that led there (as flameprof / gprof2dot do).
+    """
+    entries = stats.stats
+    callees = defaultdict(list)
+    roots = []
+    for func, (_, _, _, ct, callers) in entries.items():
+        if not callers:
+            roots.append((func, ct))
+        for caller, edge in callers.items():
+            callees[caller].append((func, edge[3]))
+
+    total = sum(ct for _, ct in roots)
+    floor = total / 5000  # drop slivers too thin to see; bounds the output
+    folded = Counter()
+
+    def walk(func, spent, stack, on_stack):
+        _, _, tt, ct, _ = entries[func]
+        stack = stack + (_frame_label(func),)
+        scale = spent / ct if ct else 0.0
+        folded[";".join(stack)] += tt * scale
+        for child, edge_ct in callees.get(func, ()):
+            share = edge_ct * scale
+            if child not in on_stack and share >= floor and len(stack) < 200:
+                walk(child, share, stack, on_stack | {child})
+
+    for func, ct in roots:
+        walk(func, ct, (), frozenset((func,)))
+
+    return "".join(
+        f"{stack} {round(seconds * 1e6)}\n"
+        for stack, seconds in folded.items()
+        if seconds * 1e6 >= 1
+    )
+
+
+# -----------------------
+# STORAGE
+# -----------------------
+def save(profiler, view_name, elapsed_ms):
+    """Write .prof and .collapsed files; returns the profile name."""
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+    view = re.sub(r"[^\w.-]", "-", view_name)[:60] or "unknown"
+    name = f"{stamp}_{view}_{round(elapsed_ms)}ms"
+
+    profiler.dump_stats(PROFILE_DIR / f"{name}.prof")
+    stats = pstats.Stats(profiler)
+    (PROFILE_DIR / f"{name}.collapsed").write_text(collapsed_stacks(stats))
+
+    rotate()
+    return name
+
+
+def rotate(keep=None):
+    keep = PROFILE_KEEP if keep is None else keep
+    for entry in recent()[keep:]:
+        for path in entry["files"].values():
+            path.unlink(missing_ok=True)
+
+
+def recent():
+    """Saved profiles, newest first."""
+    if not PROFILE_DIR.is_dir():
+        return []
+
+    profiles = {}
+    for path in PROFILE_DIR.iterdir():
+        match = PROFILE_NAME.match(path.stem)
+        if not match or path.suffix not in (".prof", ".collapsed"):
+            continue
+        entry = profiles.setdefault(path.stem, {
+            "name": path.stem,
+            "created": datetime.strptime(match["stamp"], "%Y%m%d-%H%M%S-%f"),
+            "view": match["view"],
+            "ms": int(match["ms"]),
+            "files": {},
+        })
+        entry["files"][path.suffix[1:]] = path
+
+    return sorted(profiles.values(), key=lambda e: e["name"], reverse=True)
+
+
+def path_for(name, kind):
+    """File for a listed profile, or None (never trusts the name as a path)."""
+    if kind not in ("prof", "collapsed") or not PROFILE_NAME.match(name):
+        return None
+    path = PROFILE_DIR / f"{name}.{kind}"
+    return path if path.is_file() else None
+
+
+def summary(name, limit=40):
+    """Top functions by cumulative time, as pstats prints them."""
+    path = path_for(name, "prof")
+    if path is None:
+        return None
+    out = io.StringIO()
+    stats = pstats.Stats(str(path), stream=out)
+    stats.strip_dirs().sort_stats("cumulative").print_stats(limit)
+    return out.getvalue()
+
+
+# -----------------------
+# MIDDLEWARE
+# -----------------------
+class ProfilingMiddleware:
+    """Goes last in MIDDLEWARE (needs request.user; wraps only the view)."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not self.wanted(request):
+            return self.get_response(request)
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler already owns this thread
+            return self.get_response(request)
+
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        match = getattr(request, "resolver_match", None)
+        view_name = (match and (match.view_name or match.url_name)) or "unresolved"
+        try:
+            name = save(profiler, view_name, elapsed_ms)
+        except OSError:
+            logger.exception("Could not write profile to %s", PROFILE_DIR)
+            return response
+
+        user = getattr(request, "user", None)
+        if user is not None and user.is_staff:
+            response["X-Profile"] = name
+        return response
+
+    def wanted(self, request):
+        if request.GET.get("profile") == "1":
+            user = getattr(request, "user", None)
+            if user is not None and user.is_staff:
+                return True
+        return bool(PROFILE_SAMPLE_RATE) and next(_counter) % PROFILE_SAMPLE_RATE == 0
@@ -0,0 +1,225 @@
+# farmclassifieds/routers.py
+
+import random
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.utils import timezone
+
+
+# ---------------------------------------------
+# READ REPLICAS FOR PUBLIC BROWSE PAGES
+# ---------------------------------------------
+# ReplicaMiddleware marks GET / HEAD requests to the views in REPLICA_VIEWS
+# (listings, search, detail, the read API) as replica-safe; ReplicaRouter
+# then sends their farmclassifieds reads to one of DATABASE_REPLICAS,
+# picked once per request. Everything else stays on the primary:
+#   * writes, and every read after a write in the same request;
+#   * reads inside a transaction on the primary;
+#   * users and sessions (auth must see its own writes);
+#   * for REPLICA_PIN_SECONDS after a write, the whole browser: the write
+#     response sets a short-lived cookie, so a seller sees their new ad
+#     on the next page even if the replicas haven't caught up yet;
+#   * any replica whose lag (ReplicaHeartbeat, checked every
+#     REPLICA_CHECK_INTERVAL seconds per process) exceeds REPLICA_MAX_LAG,
+#     is unknown, or that can't be reached.
+# The heartbeat is written by `manage.py replica_heartbeat` (run it under
+# a supervisor next to the web workers), never by a request. While its
+# last beat is older than REPLICA_HEARTBEAT_STALE seconds the lag can't
+# be measured, and every read stays on the primary.
+# With no DATABASE_REPLICAS configured the router returns None everywhere.
+
+REPLICAS = list(getattr(settings, "DATABASE_REPLICAS", []))
+REPLICA_VIEWS = frozenset(getattr(settings, "REPLICA_VIEWS", (
+    "post_list", "filtered_view", "search_results", "select_category",
+    "posts_by_location", "post_detail", "api_v1_post_list", "api_v1_post_detail",
+)))
+REPLICA_MAX_LAG = getattr(settings, "REPLICA_MAX_LAG", 5)
+REPLICA_CHECK_INTERVAL = getattr(settings, "REPLICA_CHECK_INTERVAL", 2)
+REPLICA_PIN_SECONDS = getattr(settings, "REPLICA_PIN_SECONDS", 15)
+REPLICA_HEARTBEAT_INTERVAL = getattr(settings, "REPLICA_HEARTBEAT_INTERVAL", 1)
+REPLICA_HEARTBEAT_STALE = getattr(settings, "REPLICA_HEARTBEAT_STALE", 10)
+
+PIN_COOKIE = "primary_pin"
+
+_local = threading.local()
+
+
+class RequestState:
+    def __init__(self):
+        self.replica_ok = False  # set in process_view for REPLICA_VIEWS
+        self.wrote = False
+        self.alias = None  # chosen replica; None until the first read
+        self.picked = False
+
+
+def current():
+    return getattr(_local, "state", None)
+
+
+# -----------------------
+# REPLICA HEALTH
+# -----------------------
+class ReplicaHealth:
+    """Per-process lag cache: {alias: (checked at, usable)}."""
+
+    def __init__(self):
+        self._checked = {}
+        self._lock = threading.Lock()
+
+    def usable(self, alias):
+        now = time.monotonic()
+        with self._lock:
+            checked = self._checked.get(alias)
+        if checked and now - checked[0] < REPLICA_CHECK_INTERVAL:
+            return checked[1]
+
+        seconds = lag(alias)
+        ok = seconds is not None and seconds <= REPLICA_MAX_LAG
+        with self._lock:
+            self._checked[alias] = (now, ok)
+        return ok
+
+    def pick(self, replicas):
+        healthy = [alias for alias in replicas if self.usable(alias)]
+        return random.choice(healthy) if healthy else None
+
+    def forget(self):
+        with self._lock:
+            self._checked.clear()
+
+
+def beat(now=None):
+    """Write the primary's heartbeat (replica_heartbeat command)."""
+    from .models import ReplicaHeartbeat
+
+    now = now or timezone.now()
+    ReplicaHeartbeat.objects.using(DEFAULT_DB_ALIAS).update_or_create(
+        pk=1, defaults={"beat_at": now},
+    )
+    return now
+
+
+def lag(alias):
+    """
+    Seconds the replica's heartbeat trails the primary's, or None if it
+    can't be told: the replica can't be read or has no heartbeat, or
+    the primary's heartbeat is missing or stale (the heartbeat writer
+    isn't running, so a replica equally far behind would look current).
+    """
+    from .models import ReplicaHeartbeat
+
+    try:
+        replica_beat = (
+            ReplicaHeartbeat.objects.using(alias)
+            .filter(pk=1).values_list("beat_at", flat=True).first()
+        )
+    except DatabaseError:
+        # Don't keep a broken persistent connection around
+        connections[alias].close()
+        return None
+
+    primary_beat = (
+        ReplicaHeartbeat.objects.using(DEFAULT_DB_ALIAS)
+        .filter(pk=1).values_list("beat_at", flat=True).first()
+    )
+    if primary_beat is None or replica_beat is None:
+        return None
+    if timezone.now() - primary_beat > timedelta(seconds=REPLICA_HEARTBEAT_STALE):
+        return None
+    return max((primary_beat - replica_beat).total_seconds(), 0.0)
+
+
+health = ReplicaHealth()
+
+
+# -----------------------
+# ROUTER
+# -----------------------
+def _replicable(model):
+    from .models import ReplicaHeartbeat
+
+    return (
+        model._meta.app_label == "farmclassifieds"
+        and model._meta.label != settings.AUTH_USER_MODEL
+        and model is not ReplicaHeartbeat
+    )
+
+
+class ReplicaRouter:
+    def __init__(self):
+        self.replicas = REPLICAS
+
+    def db_for_read(self, model, **hints):
+        state = current()
+        if not self.replicas or state is None or not state.replica_ok:
+            return None
+        if state.wrote or not _replicable(model):
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+
+        if not state.picked:
+            state.alias = health.pick(self.replicas)
+            state.picked = True
+        return state.alias or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        state = current()
+        if state is not None:
+            state.wrote = True
+        # Explicit: an instance read from a replica must still save to the primary
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema through replication
+        return False if db in self.replicas else None
+
+
+# -----------------------
+# MIDDLEWARE
+# -----------------------
+def pinned(request):
+    try:
+        return float(request.COOKIES.get(PIN_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+class ReplicaMiddleware:
+    """Early in MIDDLEWARE: holds the per-request routing state."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        state = _local.state = RequestState()
+        try:
+            response = self.get_response(request)
+        finally:
+            _local.state = None
+
+        # Only the user's own writes pin (not e.g. a view-count flush on a GET)
+        if state.wrote and request.method not in ("GET", "HEAD"):
+            until = time.time() + REPLICA_PIN_SECONDS
+            response.set_cookie(
+                PIN_COOKIE, f"{until:.0f}", max_age=REPLICA_PIN_SECONDS,
+                httponly=True, samesite="Lax",
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        state = current()
+        if state is not None:
+            state.replica_ok = (
+                request.method in ("GET", "HEAD")
+                and request.resolver_match.url_name in REPLICA_VIEWS
+                and not pinned(request)
+            )
@@ -0,0 +1,160 @@
+# farmclassifieds/search.py
+
+import re
+
+from django.db import connections
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+
+# ---------------------------------------------
+# FULL-TEXT KEYWORD SEARCH
+# ---------------------------------------------
+# One side table holds the inverted index for AdPost.title / contents:
+#   * SQLite     -> FTS5 virtual table (rowid = AdPost.id), bm25 ranking
+#   * PostgreSQL -> tsvector column with a GIN index, ts_rank ranking
+# It is kept in sync by the AdPost post_save / post_delete signals
+# (see signals.py) and can be rebuilt with `manage.py rebuild_search_index`.
+
+FTS_TABLE = "farmclassifieds_adpost_fts"
+
+# Title matches count more than body matches
+TITLE_WEIGHT = 4.0
+CONTENTS_WEIGHT = 1.0
+
+MAX_TERMS = 8
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def _terms(query):
+    return _WORD_RE.findall(query.lower())[:MAX_TERMS]
+
+
+def _fts5_match(terms):
+    # Quote every term so user input can't inject FTS5 syntax; the last
+    # term is a prefix match so "tilapia finger" already finds results.
+    quoted = [f'"{t}"' for t in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+# ---------------------------------------------
+# REBUILD
+# ---------------------------------------------
+def rebuild_index(using=None):
+    """Re-index every AdPost. Returns the number of rows indexed."""
+    conn = connections[using or "default"]
+
+    with conn.cursor() as cursor:
+        if conn.vendor == "sqlite":
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, title, contents) "
+                "SELECT id, title, contents FROM farmclassifieds_adpost"
+            )
+        elif conn.vendor == "postgresql":
+            cursor.execute(f"TRUNCATE {FTS_TABLE}")
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (post_id, document) "
+                "SELECT id,"
+                " setweight(to_tsvector('english', title), 'A') ||"
+                " setweight(to_tsvector('english', contents), 'B')"
+                " FROM farmclassifieds_adpost"
+            )
+        else:
+            return 0
+        return cursor.rowcount
+
+
+# ---------------------------------------------
+# SYNC (called from signals)
+# ---------------------------------------------
+def index_post(post, using="default"):
+    conn = connections[using]
+
+    with conn.cursor() as cursor:
+        if conn.vendor == "sqlite":
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [post.pk])
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, title, contents) VALUES (%s, %s, %s)",
+                [post.pk, post.title, post.contents],
+            )
+        elif conn.vendor == "postgresql":
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (post_id, document) VALUES (%s,"
+                " setweight(to_tsvector('english', %s), 'A') ||"
+                " setweight(to_tsvector('english', %s), 'B'))"
+                " ON CONFLICT (post_id) DO UPDATE SET document = EXCLUDED.document",
+                [post.pk, post.title, post.contents],
+            )
+
+
+def unindex_post(pk, using="default"):
+    unindex_posts([pk], using=using)
+
+
+def unindex_posts(pks, using="default"):
+    """Drop many ads from the index in one DELETE (bulk moderation)."""
+    pks = list(pks)
+    conn = connections[using]
+    column = {"sqlite": "rowid", "postgresql": "post_id"}.get(conn.vendor)
+    if column is None:
+        return
+
+    with conn.cursor() as cursor:
+        # Stay under SQLite's bound-parameter limit
+        for i in range(0, len(pks), 500):
+            chunk = pks[i:i + 500]
+            placeholders = ", ".join(["%s"] * len(chunk))
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE {column} IN ({placeholders})", chunk)
+
+
+# ---------------------------------------------
+# QUERY
+# ---------------------------------------------
+def keyword_search(queryset, query):
+    """
+    Restrict an AdPost queryset to ads matching `query` and annotate a
+    `rank` (higher = more relevant). Returns the queryset unchanged when
+    the query has no searchable words.
+    """
+    terms = _terms(query or "")
+    if not terms:
+        return queryset
+
+    table = queryset.model._meta.db_table
+    vendor = connections[queryset.db].vendor
+
+    if vendor == "sqlite":
+        match = _fts5_match(terms)
+        ids = RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [match])
+        # bm25() is "lower is better", so flip the sign
+        rank = RawSQL(
+            f"SELECT -bm25({FTS_TABLE}, %s, %s) FROM {FTS_TABLE} "
+            f"WHERE {FTS_TABLE} MATCH %s AND rowid = {table}.id",
+            [TITLE_WEIGHT, CONTENTS_WEIGHT, match],
+            output_field=FloatField(),
+        )
+        return queryset.filter(pk__in=ids).annotate(rank=rank)
+
+    if vendor == "postgresql":
+        text = " ".join(terms)
+        ids = RawSQL(
+            f"SELECT post_id FROM {FTS_TABLE} "
+            "WHERE document @@ plainto_tsquery('english', %s)",
+            [text],
+        )
+        rank = RawSQL(
+            f"SELECT ts_rank(document, plainto_tsquery('english', %s)) "
+            f"FROM {FTS_TABLE} WHERE post_id = {table}.id",
+            [text],
+            output_field=FloatField(),
+        )
+        return queryset.filter(pk__in=ids).annotate(rank=rank)
+
+    # Other backends have no index here; plain substring match
+    q = Q()
+    for term in terms:
+        q &= Q(title__icontains=term) | Q(contents__icontains=term)
+    return queryset.filter(q).annotate(rank=Value(0.0, output_field=FloatField()))
@@ -0,0 +1,120 @@
+# farmclassifieds/signals.py
+
+import threading
+from contextlib import contextmanager
+from functools import wraps
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import blobstore, cards, facets, search
+from .models import AdImage, AdPost
+
+
+# ---------------------------------------------
+# BULK PATHS
+# ---------------------------------------------
+# moderation.py deletes hundreds of ads at once and does the index /
+# blob / card / facet upkeep itself in a few set-based statements.
+# Inside `with signals.muted():` the per-row handlers below do nothing.
+_state = threading.local()
+
+
+@contextmanager
+def muted():
+    previous = getattr(_state, "muted", False)
+    _state.muted = True
+    try:
+        yield
+    finally:
+        _state.muted = previous
+
+
+def per_row(handler):
+    @wraps(handler)
+    def inner(*args, **kwargs):
+        if getattr(_state, "muted", False):
+            return None
+        return handler(*args, **kwargs)
+    return inner
+
+
+# ---------------------------------------------
+# KEEP THE KEYWORD INDEX IN SYNC
+# ---------------------------------------------
+@receiver(post_save, sender=AdPost)
+@per_row
+def index_adpost(sender, instance, raw=False, using="default", update_fields=None, **kwargs):
+    if raw:
+        return
+    # Saves that don't touch the text (view counts, renewals) skip the work
+    if update_fields is not None and not {"title", "contents"} & set(update_fields):
+        return
+    search.index_post(instance, using=using)
+
+
+@receiver(post_delete, sender=AdPost)
+@per_row
+def unindex_adpost(sender, instance, using="default", **kwargs):
+    search.unindex_post(instance.pk, using=using)
+
+
+# ---------------------------------------------
+# IMAGE BLOB REFERENCE COUNTS
+# ---------------------------------------------
+@receiver(post_delete, sender=AdImage)
+@per_row
+def release_image_blob(sender, instance, **kwargs):
+    if instance.blob_id:
+        blobstore.release(instance.blob_id)
+
+
+# ---------------------------------------------
+# LISTING CARD CACHE
+# ---------------------------------------------
+@receiver(post_save, sender=AdPost)
+@receiver(post_delete, sender=AdPost)
+@per_row
+def invalidate_post_card(sender, instance, **kwargs):
+    cards.invalidate(instance.pk)
+
+
+@receiver(post_save, sender=AdImage)
+@receiver(post_delete, sender=AdImage)
+@per_row
+def invalidate_image_card(sender, instance, **kwargs):
+    # The image set is part of the post: bump modified_at so the detail
+    # page's ETag / Last-Modified change too.
+    AdPost.objects.filter(pk=instance.post_id).update(modified_at=timezone.now())
+    cards.invalidate(instance.post_id)
+
+
+# ---------------------------------------------
+# FACET COUNTS
+# ---------------------------------------------
+@receiver(post_save, sender=AdPost)
+@per_row
+def count_facets_on_save(sender, instance, created, raw=False, using="default", update_fields=None, **kwargs):
+    if raw:
+        return
+    if update_fields is not None and not facets.FACET_FIELDS & set(update_fields):
+        return
+
+    before = {} if created else getattr(instance, "stored", {})
+    after = instance.values_after_save(update_fields)
+    if not created and facets.LIVE_FIELDS - before.keys() or facets.LIVE_FIELDS - after.keys():
+        # Not loaded from the database, or with tracked fields deferred
+        facets.refresh_on_commit()
+        return
+    facets.move(None if created else facets.live_pair(before), facets.live_pair(after), using)
+
+
+@receiver(post_delete, sender=AdPost)
+@per_row
+def count_facets_on_delete(sender, instance, using="default", **kwargs):
+    stored = getattr(instance, "stored", {})
+    if facets.LIVE_FIELDS - stored.keys():
+        facets.refresh_on_commit()
+        return
+    facets.move(facets.live_pair(stored), None, using)
@@ -0,0 +1,64 @@
+# farmclassifieds/templatetags/listing_images.py
+
+from django import template
+from django.utils.html import format_html, format_html_join
+
+register = template.Library()
+
+
+def _srcset(ad_image, renditions, fmt, full_url):
+    storage = ad_image.image.storage
+    parts = [
+        (storage.url(r[fmt]), r["w"])
+        for r in renditions
+        if r.get(fmt)
+    ]
+    if full_url and ad_image.width:
+        parts.append((full_url, ad_image.width))
+    return format_html_join(", ", "{} {}w", parts)
+
+
+@register.simple_tag
+def responsive_image(ad_image, sizes="100vw", css_class="", style="", alt=""):
+    """
+    <picture> with WebP + JPEG srcsets built from AdImage.renditions, so
+    the browser downloads the smallest file that fills the slot.
+
+        {% responsive_image img sizes="(max-width: 768px) 100vw, 33vw" css_class="card-img-top" %}
+
+    Images the worker hasn't processed yet fall back to the original file.
+    """
+    renditions = ad_image.renditions or []
+
+    if not renditions:
+        webp = ""
+        if ad_image.webp_image:
+            webp = format_html('<source srcset="{}" type="image/webp">', ad_image.webp_image.url)
+        dims = ""
+        if ad_image.width and ad_image.height:
+            dims = format_html(' width="{}" height="{}"', ad_image.width, ad_image.height)
+        return format_html(
+            '<picture>{}<img src="{}"{} class="{}" style="{}" alt="{}" loading="lazy"></picture>',
+            webp, ad_image.image.url, dims, css_class, style, alt,
+        )
+
+    webp_full = ad_image.webp_image.url if ad_image.webp_image else ""
+    webp_srcset = _srcset(ad_image, renditions, "webp", webp_full)
+    jpg_srcset = _srcset(ad_image, renditions, "jpg", ad_image.image.url)
+
+    # width/height reserve the box before the file arrives (no layout shift)
+    smallest = renditions[0]
+
+    webp = ""
+    if webp_srcset:
+        webp = format_html(
+            '<source type="image/webp" srcset="{}" sizes="{}">', webp_srcset, sizes,
+        )
+
+    return format_html(
+        '<picture>{}<img src="{}" srcset="{}" sizes="{}" width="{}" height="{}" '
+        'class="{}" style="{}" alt="{}" loading="lazy" decoding="async"></picture>',
+        webp,
+        ad_image.image.storage.url(smallest["jpg"]) if smallest.get("jpg") else ad_image.image.url,
+        jpg_srcset, sizes, smallest["w"], smallest["h"], css_class, style, alt,
+    )
@@ -1,3 +1,312 @@
-from django.test import TestCase
+import random
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from pathlib import Path
 
-# Create your tests here.
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, connections
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+
+from . import blobstore, facets, moderation, routers, viewcounts
+from .geo import haversine_km
+from .imaging import apply_variants, encode_variants
+from .models import AdImage, AdPost, ImageBlob, ListingFacet, PostcodeCentroid
+from .pagination import SORT_KEYS, KeysetPaginator, cursor_querystring
+
+
+def _post(**fields):
+    return AdPost(**{
+        "title": "Test listing",
+        "contents": "Test listing.",
+        "category": "goat",
+        "phone_number": "9000000000",
+        "district": "Kottayam",
+        "admin_verified": True,
+        "expires_at": timezone.now() + timedelta(days=60),
+        **fields,
+    })
+
+
+class RadiusSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(19)
+        # Kerala-sized spread of centroids, a few ads on each
+        cls.centroids = PostcodeCentroid.objects.bulk_create([
+            PostcodeCentroid(
+                postcode=str(680000 + n),
+                latitude=rng.uniform(8.2, 12.8),
+                longitude=rng.uniform(74.8, 77.4),
+            )
+            for n in range(300)
+        ])
+        AdPost.objects.bulk_create([
+            _post(
+                postcode=c.postcode,
+                postcode_digits=c.postcode,
+                latitude=c.latitude,
+                longitude=c.longitude,
+            )
+            for c in cls.centroids
+            for _ in range(rng.randint(1, 5))
+        ])
+        cls.rows = list(AdPost.objects.values_list("pk", "latitude", "longitude"))
+
+    def test_within_radius_matches_brute_force(self):
+        centres = random.Random(7).sample(self.centroids, 8)
+        for km in (10, 25, 50, 100):
+            for c in centres:
+                found = dict(
+                    AdPost.objects.within_radius(c.latitude, c.longitude, km)
+                    .values_list("pk", "distance")
+                )
+                expected = {
+                    pk for pk, lat, lon in self.rows
+                    if haversine_km(c.latitude, c.longitude, lat, lon) <= km
+                }
+                self.assertEqual(set(found), expected, f"{km}km around {c.postcode}")
+                for pk, distance in found.items():
+                    self.assertLessEqual(distance, km)
+
+    def test_save_locates_only_when_postcode_changes(self):
+        post = _post(postcode="680 001")
+        post.save()
+        first = self.centroids[1]
+        self.assertEqual((post.latitude, post.longitude), (first.latitude, first.longitude))
+
+        def centroid_lookups(post):
+            with CaptureQueriesContext(connection) as queries:
+                post.save()
+            return sum("postcodecentroid" in q["sql"] for q in queries)
+
+        post = AdPost.objects.get(pk=post.pk)
+        post.title = "Renamed"
+        self.assertEqual(centroid_lookups(post), 0)
+
+        post.postcode = "680-002"
+        self.assertEqual(centroid_lookups(post), 1)
+        second = self.centroids[2]
+        self.assertEqual((post.latitude, post.longitude), (second.latitude, second.longitude))
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        base = timezone.now() - timedelta(days=10)
+        AdPost.objects.bulk_create([_post(postcode="680001") for _ in range(23)])
+        prices = [None, Decimal("500"), Decimal("500"), Decimal("120"), None, Decimal("999.50")]
+        for n, pk in enumerate(AdPost.objects.order_by("id").values_list("pk", flat=True)):
+            # Runs of equal timestamps and prices, and a block without a price
+            AdPost.objects.filter(pk=pk).update(
+                created_at=base + timedelta(hours=n // 3),
+                price=prices[n % len(prices)],
+            )
+
+    def expected(self, sort):
+        field, descending, _ = SORT_KEYS[sort]
+        posts = list(AdPost.objects.all())
+        priced = [p for p in posts if getattr(p, field) is not None]
+        unpriced = [p for p in posts if getattr(p, field) is None]
+        priced.sort(key=lambda p: (getattr(p, field), p.pk), reverse=descending)
+        unpriced.sort(key=lambda p: p.pk, reverse=descending)
+        return [p.pk for p in priced + unpriced]
+
+    def test_walk_forward_and_back(self):
+        for sort in SORT_KEYS:
+            paginator = KeysetPaginator(AdPost.objects.all(), 4, sort)
+            pages, page = [], paginator.get_page()
+            self.assertFalse(page.has_previous)
+            while True:
+                pages.append([p.pk for p in page])
+                if not page.has_next:
+                    break
+                page = paginator.get_page(page.next_cursor)
+            self.assertEqual(sum(pages, []), self.expected(sort), sort)
+
+            # And back again from the last page
+            for previous in reversed(pages[:-1]):
+                page = paginator.get_page(page.previous_cursor)
+                self.assertEqual([p.pk for p in page], previous, sort)
+            self.assertFalse(page.has_previous)
+
+    def test_bad_cursor_gives_first_page(self):
+        paginator = KeysetPaginator(AdPost.objects.all(), 4, "price_low")
+        first = [p.pk for p in paginator.get_page()]
+        cursor = paginator.get_page().next_cursor
+        tampered = cursor[:-2] + ("AA" if cursor[-2:] != "AA" else "BB")
+        foreign = KeysetPaginator(AdPost.objects.all(), 4, "new").get_page().next_cursor
+        for token in (tampered, foreign, "garbage"):
+            self.assertEqual([p.pk for p in paginator.get_page(token)], first)
+
+    def test_cursor_querystring_keeps_filters(self):
+        request = RequestFactory().get("/", {"district": "Kottayam", "cursor": "old"})
+        query = cursor_querystring(request, "new-cursor")
+        self.assertIn("district=Kottayam", query)
+        self.assertIn("cursor=new-cursor", query)
+        self.assertEqual(cursor_querystring(request, None), "")
+
+
+class ViewCountBufferTests(TestCase):
+    def test_batch_stays_pending_until_written(self):
+        post = _post(postcode="680001")
+        post.save()
+        buffer = viewcounts.ViewCountBuffer(flush_interval=0)
+        buffer.record(post.pk, 3)
+
+        during = []
+
+        def spy(execute, sql, params, many, context):
+            if sql.startswith("UPDATE"):
+                during.append(buffer.pending(post.pk))
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(spy):
+            self.assertEqual(buffer.flush(), 3)
+        self.assertEqual(during, [3])
+        self.assertEqual(buffer.pending(post.pk), 0)
+        post.refresh_from_db()
+        self.assertEqual(post.view_count, 3)
+
+
+class FacetDeltaTests(TestCase):
+    def snapshot(self):
+        return {
+            (district, category): n
+            for district, category, n in ListingFacet.objects.filter(live_count__gt=0)
+            .values_list("district", "category", "live_count")
+        }
+
+    def edit(self, post, **fields):
+        # The form path: fetched, changed, saved one row at a time
+        post = AdPost.objects.get(pk=post.pk)
+        for name, value in fields.items():
+            setattr(post, name, value)
+        post.save()
+
+    def test_deltas_match_refresh(self):
+        posts = [
+            _post(district=district, category=category, admin_verified=verified)
+            for district in ("Kottayam", "Idukki")
+            for category in ("goat", "cow", "duck")
+            for verified in (True, False)
+        ]
+        for post in posts:
+            post.save()
+        yesterday = timezone.now() - timedelta(days=1)
+
+        self.edit(posts[0], district="Wayanad")
+        self.edit(posts[1], district="Wayanad")
+        self.edit(posts[2], category="goat")
+        moderation.approve(AdPost.objects.filter(pk__in=[posts[1].pk, posts[3].pk]))
+
+        self.edit(posts[4], expires_at=yesterday)
+        self.edit(posts[6], expires_at=yesterday)
+        moderation.extend(AdPost.objects.filter(pk=posts[6].pk), 1)
+
+        posts[8].delete()
+        moderation.reject(AdPost.objects.filter(pk__in=[posts[10].pk, posts[11].pk]))
+
+        tracked = self.snapshot()
+        self.assertEqual(sum(tracked.values()), AdPost.objects.live().count())
+        facets.refresh()
+        self.assertEqual(tracked, self.snapshot())
+
+
+class SharedBlobTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+
+    def upload(self):
+        data = BytesIO()
+        Image.new("RGB", (40, 30), (90, 140, 60)).save(data, "PNG")
+        return SimpleUploadedFile("goat.png", data.getvalue(), "image/png")
+
+    def test_identical_uploads_share_one_blob(self):
+        first, second = _post(), _post()
+        first.save()
+        second.save()
+        [a] = AdImage.objects.ingest(first, [self.upload()])
+        [b] = AdImage.objects.ingest(second, [self.upload()])
+        self.assertEqual(a.blob_id, b.blob_id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with a.image.open("rb") as f:
+                apply_variants(a, encode_variants(f.read()))
+        blob = ImageBlob.objects.get(pk=a.blob_id)
+        self.assertEqual(blob.refcount, 2)
+        storage = blobstore._storage()
+        files = [name for name in blob.file_names() if name != blob.raw]
+        self.assertTrue(files)
+        self.assertTrue(all(storage.exists(name) for name in files))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        blob.refresh_from_db()
+        self.assertEqual(blob.refcount, 1)
+        self.assertTrue(all(storage.exists(name) for name in files))
+
+        # The bulk path (moderation reject) releases the last reference
+        with self.captureOnCommitCallbacks(execute=True):
+            moderation.reject(AdPost.objects.filter(pk=second.pk))
+        self.assertFalse(ImageBlob.objects.filter(pk=blob.pk).exists())
+        self.assertFalse(any(storage.exists(name) for name in files))
+
+
+class ReplicaLagTests(TestCase):
+    # The primary measured against itself: its lag is 0 whenever it is known
+
+    def test_no_heartbeat_is_unknown(self):
+        self.assertIsNone(routers.lag("default"))
+
+    def test_fresh_heartbeat(self):
+        routers.beat()
+        self.assertEqual(routers.lag("default"), 0.0)
+
+    def test_stale_heartbeat_is_unknown(self):
+        routers.beat(timezone.now() - timedelta(seconds=routers.REPLICA_HEARTBEAT_STALE + 1))
+        self.assertIsNone(routers.lag("default"))
+
+
+class ReplicaRoutingTests(TransactionTestCase):
+    """
+    The test database as primary, a second SQLite file as the replica
+    (replica_check copies one into the other). Not a TestCase: reads
+    inside its transaction always stay on the primary.
+    """
+
+    # Resolved in setUpClass, so it takes in the alias registered there
+    databases = "__all__"
+
+    @classmethod
+    def setUpClass(cls):
+        cls.scratch = tempfile.TemporaryDirectory()
+        cls.replica = Path(cls.scratch.name) / "replica.sqlite3"
+        connections.settings["replica_check"] = {
+            **connections.settings["default"], "NAME": str(cls.replica),
+        }
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections["replica_check"].close()
+        del connections.settings["replica_check"]
+        cls.scratch.cleanup()
+
+    def tearDown(self):
+        # post_detail buffers view counts; write them while the tables exist
+        viewcounts.flush()
+        super().tearDown()
+
+    def test_replica_check(self):
+        out = StringIO()
+        call_command("replica_check", replica=str(self.replica), stdout=out)
+        self.assertIn("All replica routing checks passed.", out.getvalue())
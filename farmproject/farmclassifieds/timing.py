@@ -0,0 +1,303 @@
+# farmclassifieds/timing.py
+
+import json
+import logging
+import re
+import threading
+import time
+from collections import Counter, deque
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.template.backends import django as django_backend
+from django.utils.cache import cc_delim_re, patch_vary_headers
+
+logger = logging.getLogger(__name__)
+
+
+# ---------------------------------------------
+# PER-REQUEST TIMING
+# ---------------------------------------------
+# RequestTimingMiddleware measures every request:
+#   sql   number of queries and time spent in the database
+#         (connection.execute_wrapper, so it works with DEBUG off)
+#   tpl   time rendering templates, minus the SQL run from them
+#         (TimedDjangoTemplates, the TEMPLATES backend)
+#   app   everything else (view code, middleware, serialization)
+# and reports it three ways:
+#   * a Server-Timing header (browser dev tools), for staff, or for
+#     everyone when SERVER_TIMING_HEADERS is on (default: DEBUG); never
+#     on responses a shared cache may keep (Cache-Control: public);
+#   * one JSON DEBUG line per request on the "farmclassifieds.timing"
+#     logger, and a WARNING when the same SQL shape runs more than
+#     N_PLUS_ONE_THRESHOLD times (a likely N+1);
+#   * a rolling window per URL name, shown at moderation/timings/.
+# The window is per process: with several workers each shows its own.
+
+ENABLED = getattr(settings, "REQUEST_TIMING", True)
+SERVER_TIMING_HEADERS = getattr(settings, "SERVER_TIMING_HEADERS", settings.DEBUG)
+N_PLUS_ONE_THRESHOLD = getattr(settings, "N_PLUS_ONE_THRESHOLD", 5)
+WINDOW = getattr(settings, "REQUEST_TIMING_WINDOW", 1000)
+
+BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+BUCKET_LABELS = [f"<{b}" for b in BUCKETS_MS] + [f"{BUCKETS_MS[-1]}+"]
+
+_local = threading.local()
+
+
+# -----------------------
+# SQL SHAPES
+# -----------------------
+_IN_LIST = re.compile(r"\((?:\s*%s\s*,)+\s*%s\s*\)")
+_NUMBER = re.compile(r"\b\d+\b")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+
+
+def sql_shape(sql):
+    """The statement with literals and IN-list lengths folded away."""
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("N", sql)
+    return _IN_LIST.sub("(%s...)", sql)
+
+
+# -----------------------
+# MEASUREMENT
+# -----------------------
+class RequestTimer:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sql = 0.0
+        self.sql_in_templates = 0.0
+        self.templates = 0.0
+        self.template_depth = 0
+        self.shapes = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        # connection.execute_wrapper hook
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.queries += 1
+            self.sql += elapsed
+            if self.template_depth:
+                self.sql_in_templates += elapsed
+            self.shapes[sql_shape(sql)] += 1
+
+    def repeated(self):
+        """[(shape, count)] run more than N_PLUS_ONE_THRESHOLD times."""
+        return [
+            (shape, n) for shape, n in self.shapes.most_common()
+            if n > N_PLUS_ONE_THRESHOLD
+        ]
+
+    def finish(self):
+        total = time.perf_counter() - self.started
+        tpl = max(self.templates - self.sql_in_templates, 0.0)
+        return {
+            "total_ms": total * 1000,
+            "sql_ms": self.sql * 1000,
+            "tpl_ms": tpl * 1000,
+            "app_ms": max(total - self.sql - tpl, 0.0) * 1000,
+            "queries": self.queries,
+        }
+
+
+@receiver(connection_created)
+def _time_new_connection(sender, connection, **kwargs):
+    # A database first opened mid-request (e.g. a read replica)
+    timer = getattr(_local, "timer", None)
+    if timer is not None and timer not in connection.execute_wrappers:
+        connection.execute_wrappers.append(timer)
+
+
+# -----------------------
+# TEMPLATE BACKEND
+# -----------------------
+class TimedTemplate(django_backend.Template):
+    def render(self, context=None, request=None):
+        timer = getattr(_local, "timer", None)
+        if timer is None or timer.template_depth:
+            # Not measuring, or render_to_string() inside a template already timed
+            return super().render(context, request)
+
+        timer.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            timer.templates += time.perf_counter() - started
+            timer.template_depth -= 1
+
+
+class TimedDjangoTemplates(django_backend.DjangoTemplates):
+    """
+    The Django template backend, with every render() (views, render_cards)
+    counted as template time. Set as the TEMPLATES BACKEND; includes are
+    rendered inside their parent, so they are not counted twice.
+    """
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code).template, self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template, self)
+
+
+# -----------------------
+# ROLLING WINDOW PER URL NAME
+# -----------------------
+class RollingStats:
+    def __init__(self, size=WINDOW):
+        self.size = size
+        self._samples = {}
+        self._totals = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, name, sample):
+        with self._lock:
+            window = self._samples.get(name)
+            if window is None:
+                window = self._samples[name] = deque(maxlen=self.size)
+            window.append(sample)
+            self._totals[name] += 1
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._totals.clear()
+
+    def snapshot(self):
+        """Summary per URL name, slowest p95 first."""
+        with self._lock:
+            windows = {name: list(w) for name, w in self._samples.items()}
+            totals = dict(self._totals)
+
+        rows = []
+        for name, samples in windows.items():
+            latencies = sorted(s["total_ms"] for s in samples)
+            n = len(samples)
+            buckets = Counter(_bucket(ms) for ms in latencies)
+            rows.append({
+                "name": name,
+                "count": totals[name],
+                "window": n,
+                "p50_ms": _percentile(latencies, 50),
+                "p95_ms": _percentile(latencies, 95),
+                "p99_ms": _percentile(latencies, 99),
+                "max_ms": latencies[-1],
+                "sql_ms": sum(s["sql_ms"] for s in samples) / n,
+                "tpl_ms": sum(s["tpl_ms"] for s in samples) / n,
+                "queries": sum(s["queries"] for s in samples) / n,
+                "max_queries": max(s["queries"] for s in samples),
+                "n_plus_one": sum(1 for s in samples if s["n_plus_one"]),
+                "histogram": [
+                    (label, buckets[label], 100 * buckets[label] / n)
+                    for label in BUCKET_LABELS
+                ],
+            })
+        rows.sort(key=lambda r: r["p95_ms"], reverse=True)
+        return rows
+
+
+def _bucket(ms):
+    for bound, label in zip(BUCKETS_MS, BUCKET_LABELS):
+        if ms < bound:
+            return label
+    return BUCKET_LABELS[-1]
+
+
+def _percentile(sorted_values, pct):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100))]
+
+
+stats = RollingStats()
+
+
+# -----------------------
+# MIDDLEWARE
+# -----------------------
+def _publicly_cacheable(response):
+    directives = cc_delim_re.split(response.get("Cache-Control", ""))
+    return any(d.split("=", 1)[0].strip().lower() == "public" for d in directives)
+
+
+def _url_name(request):
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "<unresolved>"
+    return match.view_name or match.url_name or "<unnamed>"
+
+
+class RequestTimingMiddleware:
+    """Goes first in MIDDLEWARE so the total covers the whole stack."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not ENABLED:
+            return self.get_response(request)
+
+        timer = _local.timer = RequestTimer()
+        # Connections this thread already has; _time_new_connection()
+        # picks up any opened during the request
+        for conn in connections.all(initialized_only=True):
+            conn.execute_wrappers.append(timer)
+        try:
+            response = self.get_response(request)
+        finally:
+            _local.timer = None
+            for conn in connections.all(initialized_only=True):
+                if timer in conn.execute_wrappers:
+                    conn.execute_wrappers.remove(timer)
+
+        result = timer.finish()
+        repeated = timer.repeated()
+        name = _url_name(request)
+
+        stats.record(name, {**result, "n_plus_one": bool(repeated)})
+        self.log(request, response, name, result, repeated)
+
+        if not _publicly_cacheable(response):
+            user = getattr(request, "user", None)
+            if SERVER_TIMING_HEADERS:
+                response["Server-Timing"] = self.header(result, repeated)
+            elif user is not None and user.is_staff:
+                response["Server-Timing"] = self.header(result, repeated)
+                patch_vary_headers(response, ["Cookie"])
+        return response
+
+    def header(self, result, repeated):
+        parts = [
+            f'sql;dur={result["sql_ms"]:.1f};desc="{result["queries"]} queries"',
+            f'tpl;dur={result["tpl_ms"]:.1f};desc="templates"',
+            f'app;dur={result["app_ms"]:.1f};desc="python"',
+            f'total;dur={result["total_ms"]:.1f}',
+        ]
+        if repeated:
+            parts.append(f'nplusone;desc="{repeated[0][1]}x same query"')
+        return ", ".join(parts)
+
+    def log(self, request, response, name, result, repeated):
+        logger.debug(json.dumps({
+            "event": "request",
+            "method": request.method,
+            "path": request.path,
+            "view": name,
+            "status": response.status_code,
+            **{k: round(v, 2) if isinstance(v, float) else v for k, v in result.items()},
+        }, separators=(",", ":")))
+
+        for shape, n in repeated:
+            logger.warning(json.dumps({
+                "event": "n_plus_one",
+                "path": request.path,
+                "view": name,
+                "count": n,
+                "sql": shape[:500],
+            }, separators=(",", ":")))
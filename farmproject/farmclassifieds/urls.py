@@ -1,7 +1,7 @@
 # farmclassifieds/urls.py
 from django.urls import path
 from django.contrib.auth.views import LogoutView
-from . import views
+from . import api, views
 
 urlpatterns = [
     path('', views.post_list, name='post_list'),
@@ -12,6 +12,7 @@ urlpatterns = [
     path('login/', views.PhoneLoginView.as_view(), name='login'),
     path('logout/', LogoutView.as_view(), name='logout'),
     path('my-posts/', views.my_posts, name='my_posts'),
+    path('my-posts/renew/', views.bulk_renew_posts, name='bulk_renew_posts'),
 path('posts/<int:pk>/edit/', views.post_edit, name='post_edit'),
 path('posts/<int:pk>/delete/', views.post_delete, name='post_delete'),
 path('admin-verification/', views.admin_verification, name='admin_verification'),
@@ -29,6 +30,10 @@ path('posts/<int:pk>/renew/', views.renew_post, name='renew_post'),
 path('moderation/posts/<int:pk>/approve/', views.admin_approve_post, name='admin_approve_post'),
 path('moderation/posts/<int:pk>/reject/', views.admin_reject_post, name='admin_reject_post'),
 path('moderation/posts/<int:pk>/extend/', views.admin_extend_post, name='admin_extend_post'),
+path('moderation/posts/bulk/', views.admin_bulk_moderate, name='admin_bulk_moderate'),
+path('moderation/timings/', views.admin_timings, name='admin_timings'),
+path('moderation/profiles/', views.admin_profiles, name='admin_profiles'),
+path('moderation/profiles/<str:name>/', views.admin_profile, name='admin_profile'),
 
 path('moderation/users/<int:user_id>/limit/', views.admin_update_ad_limit, name='admin_update_ad_limit'),
 path('moderation/users/<int:user_id>/delete/', views.admin_delete_user, name='admin_delete_user'),
@@ -37,4 +42,8 @@ path("browse/<str:district>/", views.select_category, name="select_category"),
 path("browse/<str:district>/<str:category>/", views.posts_by_location, name="posts_by_location"),
 path("search/", views.search_results, name="search_results"),
 
+# read-only JSON API
+path("api/v1/posts/", api.post_list, name="api_v1_post_list"),
+path("api/v1/posts/<int:pk>/", api.post_detail, name="api_v1_post_detail"),
+
 ]
@@ -0,0 +1,164 @@
+# farmclassifieds/viewcounts.py
+
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, connection, models
+from django.db.models import Case, F, Value, When
+
+logger = logging.getLogger(__name__)
+
+
+# ---------------------------------------------
+# WRITE-BEHIND VIEW COUNTER
+# ---------------------------------------------
+# post_detail used to run one UPDATE per first view, which serializes
+# writers on hot ads (and locks the whole file on SQLite). Views are now
+# buffered per process and written as ONE bulk UPDATE per batch:
+#   * when the buffer holds FLUSH_SIZE views, or
+#   * every FLUSH_INTERVAL seconds (background thread), or
+#   * at interpreter exit (clean worker shutdown).
+# Pages (and the API) show stored view_count + pending delta, so the
+# number never lags. A batch being written stays in pending() until its
+# UPDATE has committed.
+
+FLUSH_SIZE = getattr(settings, "VIEW_COUNT_FLUSH_SIZE", 500)
+FLUSH_INTERVAL = getattr(settings, "VIEW_COUNT_FLUSH_INTERVAL", 10)
+# How long the exit flush waits for a flush already in progress
+SHUTDOWN_TIMEOUT = getattr(settings, "VIEW_COUNT_SHUTDOWN_TIMEOUT", 10)
+
+
+class ViewCountBuffer:
+    def __init__(self, flush_size=FLUSH_SIZE, flush_interval=FLUSH_INTERVAL):
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self._pending = {}
+        self._inflight = {}  # the batch a flush is writing right now
+        self._total = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._thread_pid = None
+
+    def record(self, pk, n=1):
+        self._ensure_timer()
+
+        with self._lock:
+            self._pending[pk] = self._pending.get(pk, 0) + n
+            self._total += n
+            full = self._total >= self.flush_size
+
+        if full:
+            self.flush()
+
+    def pending(self, pk):
+        with self._lock:
+            return self._pending.get(pk, 0) + self._inflight.get(pk, 0)
+
+    def flush(self, wait=None):
+        """
+        Write all buffered views in one UPDATE. Returns the number written.
+        One flusher at a time: a concurrent caller skips, or with `wait`
+        waits up to that many seconds for the running flush to finish.
+        """
+        if wait:
+            acquired = self._flush_lock.acquire(timeout=wait)
+        else:
+            acquired = self._flush_lock.acquire(blocking=False)
+        if not acquired:
+            return 0
+
+        try:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+                self._inflight = batch
+                self._total = 0
+
+            if not batch:
+                return 0
+
+            from .models import AdPost
+
+            try:
+                AdPost.objects.filter(pk__in=batch.keys()).update(
+                    view_count=F("view_count") + Case(
+                        *[When(pk=pk, then=Value(n)) for pk, n in batch.items()],
+                        default=Value(0),
+                        output_field=models.PositiveIntegerField(),
+                    )
+                )
+            except DatabaseError:
+                logger.exception("View count flush failed; keeping %d ads buffered", len(batch))
+                self._requeue(batch)
+                return 0
+
+            with self._lock:
+                self._inflight = {}
+            return sum(batch.values())
+        finally:
+            self._flush_lock.release()
+
+    def shutdown(self, attempts=2):
+        """
+        Final flush at interpreter exit. Waits for a flush the timer thread
+        may be running, retries a failed UPDATE once, and logs whatever
+        still couldn't be written (as JSON {ad id: views}) so nothing is
+        dropped silently.
+        """
+        for attempt in range(attempts):
+            self.flush(wait=SHUTDOWN_TIMEOUT)
+            with self._lock:
+                if not self._pending:
+                    return
+            if attempt + 1 < attempts:
+                time.sleep(0.5)
+
+        with self._lock:
+            left, self._pending = self._pending, {}
+            self._total = 0
+        logger.error(
+            "View counts not written at shutdown (%d ads): %s",
+            len(left), json.dumps({str(pk): n for pk, n in left.items()}),
+        )
+
+    def _requeue(self, batch):
+        with self._lock:
+            self._inflight = {}
+            for pk, n in batch.items():
+                self._pending[pk] = self._pending.get(pk, 0) + n
+                self._total += n
+
+    def _ensure_timer(self):
+        # Started lazily, and again after a fork (the thread doesn't survive it)
+        if self._thread_pid == os.getpid() or not self.flush_interval:
+            return
+
+        with self._lock:
+            if self._thread_pid == os.getpid():
+                return
+            self._thread_pid = os.getpid()
+
+        threading.Thread(target=self._run_timer, name="view-count-flush", daemon=True).start()
+
+    def _run_timer(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("View count flush thread error")
+            finally:
+                connection.close()
+
+
+buffer = ViewCountBuffer()
+
+record = buffer.record
+pending = buffer.pending
+flush = buffer.flush
+
+atexit.register(buffer.shutdown)
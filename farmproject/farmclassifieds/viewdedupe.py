@@ -0,0 +1,133 @@
+# farmclassifieds/viewdedupe.py
+
+import base64
+import binascii
+import hashlib
+import math
+import zlib
+
+from django.conf import settings
+
+
+# ---------------------------------------------
+# UNIQUE-VIEW DEDUPLICATION
+# ---------------------------------------------
+# post_detail counts a view only the first time a visitor opens an ad.
+# Two ways to remember "already seen":
+#
+#   "cookie"  (default) a per-visitor Bloom filter in a signed cookie.
+#             Nothing is stored server side and no session is created
+#             for anonymous visitors.
+#   "session" the old viewed_post_<pk> session keys.
+#
+#     seen = viewdedupe.for_request(request)
+#     if seen.first_view(post.pk):
+#         viewcounts.record(post.pk)
+#     ...
+#     return seen.finish(response)
+#
+# Error bound (cookie): a Bloom filter never forgets an id it holds, so
+# repeat views are never double counted while the cookie lives. It can
+# wrongly report a NEW id as seen; that view is not counted. With m bits,
+# k hashes and n ids the chance is (1 - e^(-kn/m))^k. The filter is reset
+# once it holds VIEW_DEDUPE_CAPACITY ids, so the per-view undercount is
+# at most FALSE_POSITIVE_RATE (about 0.8% with the defaults). A reset, or
+# an expired / deleted cookie, lets that visitor count once more.
+
+VIEW_DEDUPE = getattr(settings, "VIEW_DEDUPE", "cookie")
+
+COOKIE_NAME = getattr(settings, "VIEW_DEDUPE_COOKIE", "seen")
+COOKIE_AGE = getattr(settings, "VIEW_DEDUPE_COOKIE_AGE", 14 * 24 * 60 * 60)
+COOKIE_SALT = "farmclassifieds.viewdedupe"
+
+BLOOM_BITS = getattr(settings, "VIEW_DEDUPE_BITS", 2048)
+BLOOM_HASHES = 3
+CAPACITY = getattr(settings, "VIEW_DEDUPE_CAPACITY", 150)
+
+FALSE_POSITIVE_RATE = (1 - math.exp(-BLOOM_HASHES * CAPACITY / BLOOM_BITS)) ** BLOOM_HASHES
+
+
+class SessionDedupe:
+    def __init__(self, request):
+        self.request = request
+
+    def first_view(self, pk):
+        key = f"viewed_post_{pk}"
+        if self.request.session.get(key):
+            return False
+        self.request.session[key] = True
+        return True
+
+    def finish(self, response):
+        return response
+
+
+class CookieDedupe:
+    """
+    Cookie value: urlsafe base64 of zlib(count as 2 bytes + bitset),
+    signed with Django's signed-cookie helpers. A mostly empty 2048-bit
+    filter compresses to a few dozen bytes.
+    """
+
+    def __init__(self, request):
+        self.request = request
+        self.changed = False
+        self.count, self.bits = self._load()
+
+    def _load(self):
+        raw = self.request.get_signed_cookie(
+            COOKIE_NAME, default=None, salt=COOKIE_SALT, max_age=COOKIE_AGE,
+        )
+        if raw:
+            try:
+                data = zlib.decompress(base64.urlsafe_b64decode(raw))
+            except (binascii.Error, ValueError, zlib.error):
+                data = b""
+            if len(data) == 2 + BLOOM_BITS // 8:
+                return int.from_bytes(data[:2], "big"), bytearray(data[2:])
+        return 0, bytearray(BLOOM_BITS // 8)
+
+    @staticmethod
+    def _positions(pk):
+        digest = hashlib.sha256(str(pk).encode()).digest()
+        return [
+            int.from_bytes(digest[4 * i:4 * i + 4], "big") % BLOOM_BITS
+            for i in range(BLOOM_HASHES)
+        ]
+
+    def first_view(self, pk):
+        positions = self._positions(pk)
+        if all(self.bits[p >> 3] & (1 << (p & 7)) for p in positions):
+            return False
+
+        if self.count >= CAPACITY:
+            # Full: start over rather than let the error rate climb
+            self.count, self.bits = 0, bytearray(BLOOM_BITS // 8)
+
+        for p in positions:
+            self.bits[p >> 3] |= 1 << (p & 7)
+        self.count += 1
+        self.changed = True
+        return True
+
+    def finish(self, response):
+        if self.changed:
+            value = base64.urlsafe_b64encode(
+                zlib.compress(self.count.to_bytes(2, "big") + bytes(self.bits), 9)
+            ).decode()
+            response.set_signed_cookie(
+                COOKIE_NAME, value, salt=COOKIE_SALT, max_age=COOKIE_AGE,
+                httponly=True, samesite="Lax",
+                secure=getattr(settings, "SESSION_COOKIE_SECURE", False),
+            )
+        return response
+
+
+BACKENDS = {
+    "cookie": CookieDedupe,
+    "session": SessionDedupe,
+}
+
+
+def for_request(request):
+    return BACKENDS[VIEW_DEDUPE](request)
@@ -8,33 +8,35 @@ from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth import login
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.views import LoginView
-from django.db.models import Q, F
-from django.http import HttpResponseNotFound
+from django.db import transaction
+from django.db.models import Count, Q, F
+from django.http import FileResponse, Http404, HttpResponseNotFound
 from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import reverse
 
+from . import facets, moderation, profiling, timing, viewcounts, viewdedupe
 from .forms import PhoneSignupForm, PhoneLoginForm, AdPostForm
-from .models import AdPost, User
-from django.db.models import Prefetch
+from .models import MAX_RENEWALS, RENEWAL_DAYS, AdPost, PostcodeCentroid, User
+from django.db.models import Prefetch, prefetch_related_objects
 from .models import AdPost, AdImage
 
 
 # ---------------------------------------------
 # PUBLIC LIST VIEW
 # ---------------------------------------------
+from django.conf import settings
 from django.db.models import Prefetch
 from .models import AdPost, AdImage
+from .cards import render_cards, stats as card_cache_stats
+from .conditional import Validators
+from .pagination import KeysetPaginator, cursor_querystring
+
+FEED_PAGE_SIZE = getattr(settings, "FEED_PAGE_SIZE", 24)
+
 
 def post_list(request):
-    posts = (
-        AdPost.objects
-        .filter(admin_verified=True, expires_at__gt=timezone.now())
-        .prefetch_related(
-            Prefetch(
-                "images",
-                queryset=AdImage.objects.only("image", "webp_image")
-            )
-        )
-    )
+    # Card images are prefetched by render_cards, for cache misses only
+    posts = AdPost.objects.live()
 
     # -----------------------
     # FILTERS (OPTIONAL)
@@ -44,50 +46,51 @@ def post_list(request):
     postcode = request.GET.get("postcode")
 
     if district:
-        posts = posts.filter(district__iexact=district)
+        posts = posts.filter(district=district)
 
     if category:
         posts = posts.filter(category=category)
 
     if postcode:
-        posts = posts.filter(postcode__icontains=postcode)
+        posts = posts.postcode_prefix(postcode)
 
     # -----------------------
-    # SORTING
+    # SORTING + KEYSET PAGINATION
     # -----------------------
     sort = request.GET.get("sort", "new")
 
-    if sort == "price_low":
-        posts = posts.order_by("price")
-    elif sort == "price_high":
-        posts = posts.order_by("-price")
-    elif sort == "old":
-        posts = posts.order_by("created_at")
-    else:
-        posts = posts.order_by("-created_at")  # default newest
+    paginator = KeysetPaginator(posts, FEED_PAGE_SIZE, sort)
+    page = paginator.get_page(request.GET.get("cursor"))
+    sort = paginator.sort
 
     # -----------------------
-    # FILTER OPTIONS
+    # FILTER OPTIONS (cached facet counts, no AdPost query)
     # -----------------------
-    districts = (
-        AdPost.objects
-        .filter(admin_verified=True)
-        .values_list("district", flat=True)
-        .distinct()
-        .order_by("district")
+    districts = facets.district_options()
+    categories = facets.category_options()
+
+    # 304 before any card / template rendering if nothing changed
+    validators = Validators(
+        request,
+        [(post.pk, post.modified_at) for post in page],
+        page.has_next, page.has_previous, districts, categories,
     )
-
-    categories = AdPost.CATEGORY_CHOICES
-
-    return render(request, "post_list.html", {
-        "posts": posts,
+    cached = validators.not_modified()
+    if cached:
+        return cached
+
+    return validators.apply(render(request, "post_list.html", {
+        "cards": render_cards(page.object_list),
+        "page": page,
+        "next_query": cursor_querystring(request, page.next_cursor),
+        "prev_query": cursor_querystring(request, page.previous_cursor),
         "districts": districts,
         "categories": categories,
         "selected_district": district,
         "selected_category": category,
         "selected_postcode": postcode,
         "selected_sort": sort,
-    })
+    }))
 
 
 
@@ -95,22 +98,26 @@ def post_list(request):
 # FILTERED VIEW
 # ---------------------------------------------
 def filtered_view(request):
-    posts = AdPost.objects.filter(admin_verified=True,expires_at__gt=timezone.now(),
-).order_by('-created_at')
+    posts = AdPost.objects.live()
 
     postcode = request.GET.get('postcode', '')
     category = request.GET.get('category', '')
     district = request.GET.get('district', '')
 
     if postcode:
-        posts = posts.filter(postcode__icontains=postcode)
+        posts = posts.postcode_prefix(postcode)
     if category:
         posts = posts.filter(category=category)
     if district:
         posts = posts.filter(district__icontains=district)
 
+    page = KeysetPaginator(posts, FEED_PAGE_SIZE, "new").get_page(request.GET.get("cursor"))
+
     return render(request, 'post_list.html', {
-        'posts': posts,
+        'cards': render_cards(page.object_list),
+        'page': page,
+        'next_query': cursor_querystring(request, page.next_cursor),
+        'prev_query': cursor_querystring(request, page.previous_cursor),
         'postcode': postcode,
         'category': category,
         'district': district
@@ -121,7 +128,7 @@ def filtered_view(request):
 # POST DETAIL VIEW  ✅ FIXED (NO redirect loop)
 # ---------------------------------------------
 from django.db.models import F
-from django.http import HttpResponseNotFound
+from django.http import FileResponse, Http404, HttpResponseNotFound
 from django.shortcuts import get_object_or_404, redirect, render
 from django.contrib import messages
 
@@ -134,17 +141,35 @@ def post_detail(request, pk):
     if post.expires_at <= timezone.now() and not request.user.is_staff:
         return HttpResponseNotFound("This post has expired.")
     # ----------------------------------
-    # ✅ SAFE VIEW COUNT (session-based)
+    # ✅ SAFE VIEW COUNT (deduped per visitor, write-behind)
     # ----------------------------------
-    session_key = f"viewed_post_{post.pk}"
+    seen = viewdedupe.for_request(request)
 
     if request.method == "GET" and post.admin_verified:
-        if not request.session.get(session_key):
-            AdPost.objects.filter(pk=post.pk).update(
-                view_count=F("view_count") + 1
-            )
-            request.session[session_key] = True
-            post.refresh_from_db(fields=["view_count"])
+        if seen.first_view(post.pk):
+            viewcounts.record(post.pk)
+
+    # Stored count + views still waiting in the buffer
+    post.view_count += viewcounts.pending(post.pk)
+
+    # One query for the carousel, its .count checks and the ETag
+    prefetch_related_objects([post], Prefetch("images", queryset=AdImage.objects.order_by("id")))
+
+    # ----------------------------------
+    # CONDITIONAL GET
+    # ----------------------------------
+    # The view above is already recorded, so a 304 still counts. The
+    # count itself is not in the validator: a revalidated page may show
+    # a slightly older number, which is fine.
+    validators = Validators(
+        request,
+        post.pk, post.modified_at,
+        [(img.pk, img.image.name, img.webp_image.name) for img in post.images.all()],
+        last_modified=post.modified_at,
+    )
+    cached = validators.not_modified()
+    if cached:
+        return seen.finish(cached)
 
     # ----------------------------------
     # 🚩 REPORT SPAM (POST only)
@@ -171,12 +196,12 @@ def post_detail(request, pk):
         f"View details:\n{url}"
     )
 
-    return render(request, "post_detail.html", {
+    return seen.finish(validators.apply(render(request, "post_detail.html", {
         "post": post,
         "share_facebook": f"https://www.facebook.com/sharer/sharer.php?u={url}",
         "share_whatsapp": f"https://wa.me/?text={whatsapp_text}",
         "share_instagram": url,
-    })
+    })))
 
 
 # ---------------------------------------------
@@ -199,25 +224,32 @@ def post_create(request):
     if request.method == 'POST':
         form = AdPostForm(request.POST, request.FILES)
         if form.is_valid():
-            post = form.save(commit=False, user=request.user)
-
-    # ✅ AUTO-APPROVAL LOGIC
-        if request.user.is_verified_seller:
-            post.admin_verified = True
-        else:
-            post.admin_verified = False
-
-        post.save()
-        form.save_m2m()
-
-        messages.success(
-            request,
-            "Post published successfully"
-            if post.admin_verified
-            else "Post submitted for admin approval"
-        )
-
-        return redirect("my_posts")
+            try:
+                # The ad and its images are saved together, or not at all
+                with transaction.atomic():
+                    post = form.save(commit=False, user=request.user)
+
+                    # ✅ AUTO-APPROVAL LOGIC
+                    if request.user.is_verified_seller:
+                        post.admin_verified = True
+                    else:
+                        post.admin_verified = False
+
+                    post.save()
+                    form.save_m2m()
+                    form.save_images(post)
+            except ValueError as exc:
+                # Image limit re-checked under the row lock (AdImage ingest)
+                form.add_error("images", str(exc))
+            else:
+                messages.success(
+                    request,
+                    "Post published successfully"
+                    if post.admin_verified
+                    else "Post submitted for admin approval"
+                )
+
+                return redirect("my_posts")
 
     else:
         form = AdPostForm()
@@ -253,18 +285,66 @@ class PhoneLoginView(LoginView):
 # ---------------------------------------------
 # MY POSTS
 # ---------------------------------------------
+MY_POSTS_PAGE_SIZE = getattr(settings, "MY_POSTS_PAGE_SIZE", 25)
+MY_POSTS_STATUSES = ("active", "expired", "pending")
+
+
 @login_required
 def my_posts(request):
-    posts = AdPost.objects.filter(created_by=request.user).order_by("-created_at")
+    status = request.GET.get("status", "")
+    if status not in MY_POSTS_STATUSES:
+        status = ""
+
+    # Tab counts in one aggregate query
+    mine = AdPost.objects.filter(created_by=request.user)
+    counts = mine.aggregate(
+        all=Count("id"),
+        active=Count("id", filter=Q(admin_verified=True, is_expired=False)),
+        expired=Count("id", filter=Q(is_expired=True)),
+        pending=Count("id", filter=Q(admin_verified=False, is_expired=False)),
+    )
 
-    for post in posts:
-        post.renew_left = max(0, 3 - post.renew_count)
+    posts = AdPost.objects.for_owner(request.user).with_status(status)
+    page = KeysetPaginator(posts, MY_POSTS_PAGE_SIZE, "new").get_page(request.GET.get("cursor"))
 
     return render(request, "my_posts.html", {
-        "posts": posts
+        "posts": page,
+        "status": status,
+        "counts": counts,
+        "next_query": cursor_querystring(request, page.next_cursor),
+        "prev_query": cursor_querystring(request, page.previous_cursor),
     })
 
 
+@login_required
+def bulk_renew_posts(request):
+    if request.method != "POST":
+        return redirect("my_posts")
+
+    ids = {int(pk) for pk in request.POST.getlist("ids") if pk.isdigit()}
+    renewed = at_limit = 0
+    if ids:
+        mine = AdPost.objects.filter(created_by=request.user, pk__in=ids)
+        with transaction.atomic(), facets.tracking(ids):
+            at_limit = mine.filter(renew_count__gte=MAX_RENEWALS).count()
+            renewed = mine.renew()
+
+    # Deleted meanwhile, or not this seller's
+    missing = len(ids) - renewed - at_limit
+    if renewed:
+        messages.success(request, f"Renewed {renewed} ad(s) for {RENEWAL_DAYS} more days.")
+    if at_limit:
+        messages.warning(request, f"{at_limit} ad(s) were not renewed (renewal limit reached).")
+    if missing:
+        messages.warning(request, f"{missing} selected ad(s) could not be found.")
+
+    url = reverse("my_posts")
+    status = request.POST.get("status")
+    if status in MY_POSTS_STATUSES:
+        url += f"?status={status}"
+    return redirect(url)
+
+
 # ------------------------------
 # EDIT POST
 # ------------------------------
@@ -275,9 +355,16 @@ def post_edit(request, pk):
     if request.method == 'POST':
         form = AdPostForm(request.POST, request.FILES, instance=post)
         if form.is_valid():
-            form.save(user=request.user)
-            messages.success(request, "Post updated successfully.")
-            return redirect('my_posts')
+            try:
+                with transaction.atomic():
+                    form.save(user=request.user)
+            except ValueError as exc:
+                # Another upload to this ad got in first (limit re-checked
+                # under the row lock)
+                form.add_error("images", str(exc))
+            else:
+                messages.success(request, "Post updated successfully.")
+                return redirect('my_posts')
     else:
         form = AdPostForm(instance=post)
 
@@ -302,23 +389,37 @@ def post_delete(request, pk):
 # ---------------------------------------------
 # ADMIN VERIFICATION PANEL
 # ---------------------------------------------
+MODERATION_PAGE_SIZE = getattr(settings, "MODERATION_PAGE_SIZE", 50)
+
+
 @staff_member_required
 def admin_verification(request):
-    posts = AdPost.objects.filter(admin_verified=False, public_flagged=False)
-    flagged_posts = AdPost.objects.filter(public_flagged=True)
+    # Oldest pending first (adpost_pending_idx); newest reports first.
+    # Each table pages independently with its own cursor parameter.
+    pending = KeysetPaginator(
+        AdPost.objects.filter(admin_verified=False, public_flagged=False).for_moderation(),
+        MODERATION_PAGE_SIZE, "old",
+    ).get_page(request.GET.get("cursor"))
+
+    flagged = KeysetPaginator(
+        AdPost.objects.filter(public_flagged=True).for_moderation(),
+        MODERATION_PAGE_SIZE, "new",
+    ).get_page(request.GET.get("flagged_cursor"))
 
     return render(request, "admin_verification.html", {
-        "posts": posts,
-        "flagged_posts": flagged_posts,
+        "posts": pending,
+        "flagged_posts": flagged,
+        "next_query": cursor_querystring(request, pending.next_cursor),
+        "prev_query": cursor_querystring(request, pending.previous_cursor),
+        "flagged_next_query": cursor_querystring(request, flagged.next_cursor, "flagged_cursor"),
+        "flagged_prev_query": cursor_querystring(request, flagged.previous_cursor, "flagged_cursor"),
     })
 
 
 @staff_member_required
 def admin_approve_post(request, pk):
     post = get_object_or_404(AdPost, pk=pk)
-    post.admin_verified = True
-    post.public_flagged = False  # ✅ clear spam flag when approving
-    post.save(update_fields=["admin_verified", "public_flagged"])
+    moderation.approve(AdPost.objects.filter(pk=post.pk))
 
     messages.success(request, "Post approved and cleared from spam reports.")
     return redirect("admin_verification")
@@ -327,11 +428,81 @@ def admin_approve_post(request, pk):
 @staff_member_required
 def admin_reject_post(request, pk):
     post = get_object_or_404(AdPost, pk=pk)
-    post.delete()
+    moderation.reject(AdPost.objects.filter(pk=post.pk))
     messages.warning(request, "Post rejected and deleted.")
     return redirect('admin_verification')
 
 
+@staff_member_required
+def admin_bulk_moderate(request):
+    if request.method != "POST":
+        return redirect("admin_verification")
+
+    ids = [pk for pk in request.POST.getlist("ids") if pk.isdigit()]
+    action = request.POST.get("action")
+    selected = AdPost.objects.filter(pk__in=ids)
+
+    if not ids:
+        messages.warning(request, "No ads selected.")
+    elif action == "approve":
+        approved = moderation.approve(selected)
+        messages.success(request, f"Approved {approved} ad(s).")
+    elif action == "reject":
+        ads, images = moderation.reject(selected)
+        messages.warning(request, f"Deleted {ads} ad(s) and {images} image(s).")
+    elif action == "extend":
+        months = request.POST.get("months", "2")
+        months = int(months) if months.isdigit() else 2
+        extended = moderation.extend(selected, months)
+        messages.success(request, f"Extended {extended} ad(s) by {months} month(s).")
+    else:
+        messages.error(request, "Unknown action.")
+
+    return redirect("admin_verification")
+
+
+@staff_member_required
+def admin_timings(request):
+    # Rolling per-view latency from RequestTimingMiddleware (this process only)
+    if request.method == "POST":
+        timing.stats.reset()
+        messages.success(request, "Timing window cleared.")
+        return redirect("admin_timings")
+
+    return render(request, "admin_timings.html", {
+        "rows": timing.stats.snapshot(),
+        "bucket_labels": timing.BUCKET_LABELS,
+        "window": timing.WINDOW,
+        "threshold": timing.N_PLUS_ONE_THRESHOLD,
+        "card_cache": card_cache_stats(),
+    })
+
+
+@staff_member_required
+def admin_profiles(request):
+    return render(request, "admin_profiles.html", {
+        "profiles": profiling.recent(),
+        "profile_dir": profiling.PROFILE_DIR,
+        "sample_rate": profiling.PROFILE_SAMPLE_RATE,
+        "keep": profiling.PROFILE_KEEP,
+    })
+
+
+@staff_member_required
+def admin_profile(request, name):
+    kind = request.GET.get("download")
+    if kind:
+        path = profiling.path_for(name, kind)
+        if path is None:
+            raise Http404("No such profile.")
+        return FileResponse(open(path, "rb"), as_attachment=True, filename=path.name)
+
+    text = profiling.summary(name)
+    if text is None:
+        raise Http404("No such profile.")
+    return render(request, "admin_profile.html", {"name": name, "summary": text})
+
+
 @staff_member_required
 def admin_delete_user(request, user_id):
     user = get_object_or_404(User, id=user_id)
@@ -357,11 +528,11 @@ def admin_delete_user(request, user_id):
 def renew_post(request, pk):
     post = get_object_or_404(AdPost, pk=pk, created_by=request.user)
 
-    if post.renew_count >= 3:
+    if post.renew_count >= MAX_RENEWALS:
         messages.error(request, "Renewal limit reached. Contact admin.")
         return redirect("my_posts")
 
-    post.expires_at += timedelta(days=60)
+    post.expires_at += timedelta(days=RENEWAL_DAYS)
     post.renew_count += 1
     post.is_expired = False
 
@@ -398,9 +569,7 @@ def admin_extend_post(request, pk):
         except ValueError:
             months = 2
 
-        post.expires_at += timedelta(days=30 * months)
-        post.is_expired = False
-        post.save(update_fields=["expires_at", "is_expired"])
+        moderation.extend(AdPost.objects.filter(pk=post.pk), months)
 
         messages.success(
             request,
@@ -415,55 +584,58 @@ def admin_extend_post(request, pk):
 
 
 def select_category(request, district):
-    categories = (
-        AdPost.objects
-        .filter(admin_verified=True, district=district, expires_at__gt=timezone.now(),)
-        .values_list("category", flat=True)
-        .distinct()
-    )
+    categories = facets.category_options(district)
+
+    validators = Validators(request, district, categories)
+    cached = validators.not_modified()
+    if cached:
+        return cached
 
-    return render(request, "select_category.html", {
+    return validators.apply(render(request, "select_category.html", {
         "district": district,
         "categories": categories
-    })
+    }))
 
 def posts_by_location(request, district, category):
-    posts = (
-        AdPost.objects
-        .filter(
-            admin_verified=True,
-            district=district,
-            category=category,
-                        expires_at__gt=timezone.now(),
+    posts = AdPost.objects.live().filter(district=district, category=category)
+    page = KeysetPaginator(posts, FEED_PAGE_SIZE, "new").get_page(request.GET.get("cursor"))
 
-        )
-        .prefetch_related(
-            Prefetch(
-                'images',
-                queryset=AdImage.objects.only('image', 'webp_image')
-            )
-        )
-        .order_by('-created_at')
+    validators = Validators(
+        request,
+        [(post.pk, post.modified_at) for post in page],
+        page.has_next, page.has_previous,
     )
-
-    return render(request, "post_list.html", {
-        "posts": posts,
+    cached = validators.not_modified()
+    if cached:
+        return cached
+
+    return validators.apply(render(request, "post_list.html", {
+        "cards": render_cards(page.object_list),
+        "page": page,
+        "next_query": cursor_querystring(request, page.next_cursor),
+        "prev_query": cursor_querystring(request, page.previous_cursor),
         "district": district,
         "category": category
-    })
+    }))
 
 
 from django.core.paginator import Paginator
 from .models import AdPost
+from .search import keyword_search
+
+
+# km options offered next to the postcode box
+RADIUS_CHOICES = ("10", "25", "50", "100")
 
 
 def search_results(request):
-    posts = AdPost.objects.filter(admin_verified=True, expires_at__gt=timezone.now())
+    posts = AdPost.objects.live()
 
     # FILTERS
     district = request.GET.get("district")
     category = request.GET.get("category")
     postcode = request.GET.get("postcode")
+    q = request.GET.get("q", "").strip()
 
     if district:
         posts = posts.filter(district=district)
@@ -471,13 +643,28 @@ def search_results(request):
     if category:
         posts = posts.filter(category=category)
 
-    if postcode:
-        posts = posts.filter(postcode__icontains=postcode)
+    # POSTCODE: prefix match, or "within N km" of its centroid
+    radius = request.GET.get("radius", "")
+    near = None
+    if postcode and radius in RADIUS_CHOICES:
+        near = PostcodeCentroid.locate(postcode)
+    if near:
+        posts = posts.within_radius(*near, int(radius))
+    elif postcode:
+        posts = posts.postcode_prefix(postcode)
+
+    # KEYWORD SEARCH (full-text index, ranked)
+    if q:
+        posts = keyword_search(posts, q)
 
     # SORTING
-    sort = request.GET.get("sort", "new")
+    sort = request.GET.get("sort", "relevance" if q else "distance" if near else "new")
 
-    if sort == "price_low":
+    if sort == "relevance" and q:
+        posts = posts.order_by("-rank", "-created_at")
+    elif sort == "distance" and near:
+        posts = posts.order_by("distance", "-created_at")
+    elif sort == "price_low":
         posts = posts.order_by("price")
     elif sort == "price_high":
         posts = posts.order_by("-price")
@@ -491,8 +678,17 @@ def search_results(request):
     page_number = request.GET.get("page")
     page_obj = paginator.get_page(page_number)
 
+    # Cards are cached per ad, so the distance is printed beside them
+    cards = render_cards(page_obj.object_list, "search")
+    distances = [getattr(post, "distance", None) for post in page_obj.object_list]
+
     return render(request, "search_results.html", {
         "page_obj": page_obj,
+        "results": list(zip(cards, distances)),
         "sort": sort,
+        "q": q,
+        "near": near,
+        "radius": radius,
+        "unknown_postcode": bool(postcode and radius in RADIUS_CHOICES and not near),
         "request": request,
     })
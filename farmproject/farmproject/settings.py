@@ -33,6 +33,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'farmclassifieds.timing.RequestTimingMiddleware',  # first: times the whole stack
+    'farmclassifieds.routers.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -40,13 +42,16 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'farmclassifieds.profiling.ProfilingMiddleware',  # last: wraps only the view
 ]
 
 ROOT_URLCONF = 'farmproject.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates that reports render time to the request timer
+        'BACKEND': 'farmclassifieds.timing.TimedDjangoTemplates',
+        'NAME': 'django',
         'DIRS': [ BASE_DIR / "templates",],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -70,9 +75,38 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Persistent connections; init_command runs once per connection
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            # Take the write lock at BEGIN: a deferred transaction that reads
+            # then writes fails with "database is locked" instead of waiting
+            'transaction_mode': 'IMMEDIATE',
+            # Seconds to wait for the write lock (sqlite3 busy timeout)
+            'timeout': 20,
+            # WAL: readers and the writer don't block each other (stored in
+            #      the file). synchronous=NORMAL: fsync at checkpoints only,
+            #      safe with WAL. Plus ~64 MB page cache, 256 MB mmap and
+            #      in-memory temp tables. Compare: manage.py sqlite_stress
+            'init_command': (
+                'PRAGMA journal_mode=WAL;'
+                'PRAGMA synchronous=NORMAL;'
+                'PRAGMA cache_size=-64000;'
+                'PRAGMA mmap_size=268435456;'
+                'PRAGMA temp_store=MEMORY;'
+            ),
+        },
     }
 }
 
+# Read replicas for the public browse pages (farmclassifieds/routers.py), e.g.
+#   DATABASES['replica1'] = {..., 'TEST': {'MIRROR': 'default'}}
+#   DATABASE_REPLICAS = ['replica1']
+# and run `manage.py replica_heartbeat` under a supervisor: without a
+# fresh heartbeat on the primary, reads stay on the primary.
+DATABASE_REPLICAS = []
+DATABASE_ROUTERS = ['farmclassifieds.routers.ReplicaRouter']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -137,4 +171,17 @@ AUTH_PASSWORD_VALIDATORS = [
         "NAME": "django.contrib.auth.password_validation.MinimumLengthValidator",
         "OPTIONS": {"min_length": 4},
     },
-]
\ No newline at end of file
+]
+
+# N+1 warnings from farmclassifieds.timing; set its level to DEBUG for
+# one timing line per request as well
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "farmclassifieds.timing": {"handlers": ["console"], "level": "INFO", "propagate": False},
+    },
+}